@@ -2,44 +2,311 @@
 
 import json
 import asyncio
-from typing import Dict, List, Any, Optional, TypedDict, Annotated
+import operator
+import os
+import hashlib
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Dict, List, Any, Optional, Set, Tuple, Type, TypedDict, Annotated
 from datetime import datetime
 
-from langchain_core.messages import BaseMessage, HumanMessage, AIMessage, ToolMessage, SystemMessage
+import httpx
+import orjson
+import tiktoken
+from langchain_core.messages import BaseMessage, HumanMessage, AIMessage, ToolMessage, SystemMessage, convert_to_openai_messages
 from langchain_core.tools import BaseTool
+from langchain_core.utils.function_calling import convert_to_openai_tool
 from langchain_openai import ChatOpenAI
 from langchain_anthropic import ChatAnthropic
 from langgraph.graph import StateGraph, END
+from langgraph.graph.message import add_messages
 from langgraph.prebuilt import ToolNode
+from langgraph.types import Send
 from langgraph.checkpoint.memory import MemorySaver
+from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
 from loguru import logger
+from pydantic import BaseModel, ConfigDict, Field, PrivateAttr, create_model
 
 from mcp_config import MCPConfig, AgentConfig
 from mcp_manager import MCPManager
+from settings import settings
 
 
 class AgentState(TypedDict):
     """State for the audit agent."""
-    messages: Annotated[List[BaseMessage], "The conversation messages"]
+    messages: Annotated[List[BaseMessage], add_messages]
     current_task: str
     audit_code: str
     audit_profile: str
     job_id: str
     iteration: int
     max_iterations: int
-    tools_used: List[str]
+    tools_used: Annotated[Set[str], operator.or_]
     final_report: Optional[str]
+    done: bool
     error: Optional[str]
+    context_summary: Optional[str]
+    summarized_count: int
+
+
+# Connection pool shared by all OpenAI-compatible LLM instances, created on first use
+_SHARED_HTTPX: Optional[httpx.AsyncClient] = None
+
+
+def get_shared_http_client() -> httpx.AsyncClient:
+    """Get the shared LLM HTTP client, creating it on first use."""
+    global _SHARED_HTTPX
+    
+    if _SHARED_HTTPX is None:
+        _SHARED_HTTPX = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=settings.llm_max_connections,
+                max_keepalive_connections=settings.llm_max_keepalive,
+                keepalive_expiry=settings.llm_keepalive_expiry_sec,
+            ),
+            timeout=httpx.Timeout(120.0),
+            http2=True,
+        )
+    
+    return _SHARED_HTTPX
+
+
+async def warm_shared_http_client() -> None:
+    """Open a pooled connection to the LLM provider ahead of the first request."""
+    try:
+        await get_shared_http_client().head(settings.openrouter_base_url)
+    except Exception as e:
+        logger.warning(f"Failed to pre-warm LLM HTTP client: {e}")
+
+
+async def close_shared_http_client() -> None:
+    """Close the shared LLM HTTP client if it was created."""
+    global _SHARED_HTTPX
+    
+    if _SHARED_HTTPX is not None:
+        await _SHARED_HTTPX.aclose()
+        _SHARED_HTTPX = None
+
+
+# Per-server limits on in-flight MCP tool requests
+_MCP_SEMAPHORES: Dict[str, asyncio.Semaphore] = {}
+
+
+def _server_semaphore(server: Optional[str]) -> asyncio.Semaphore:
+    """Get the semaphore limiting in-flight requests to an MCP server."""
+    server_key = server or "unknown"
+    semaphore = _MCP_SEMAPHORES.get(server_key)
+    if semaphore is None:
+        semaphore = asyncio.Semaphore(settings.mcp_max_concurrent_per_server)
+        _MCP_SEMAPHORES[server_key] = semaphore
+    return semaphore
+
+
+# Subscribers to live report tokens, keyed by job ID
+_REPORT_STREAMS: Dict[str, List[asyncio.Queue]] = {}
+
+
+def open_report_stream(job_id: str) -> asyncio.Queue:
+    """Subscribe to report tokens streamed for a job; None marks the end."""
+    queue: asyncio.Queue = asyncio.Queue()
+    _REPORT_STREAMS.setdefault(job_id, []).append(queue)
+    return queue
+
+
+def release_report_stream(job_id: str, queue: asyncio.Queue) -> None:
+    """Unsubscribe a queue returned by open_report_stream."""
+    queues = _REPORT_STREAMS.get(job_id)
+    if queues and queue in queues:
+        queues.remove(queue)
+        if not queues:
+            del _REPORT_STREAMS[job_id]
+
+
+def publish_report_chunk(job_id: str, text: str) -> None:
+    """Forward a report token to every subscriber of the job."""
+    for queue in _REPORT_STREAMS.get(job_id, ()):
+        queue.put_nowait(text)
+
+
+def close_report_stream(job_id: str) -> None:
+    """Signal the end of a job's report to every subscriber."""
+    for queue in _REPORT_STREAMS.pop(job_id, ()):
+        queue.put_nowait(None)
+
+
+# LRU cache of formatted MCP tool results keyed by server, tool and arguments
+_TOOL_CACHE_MAXSIZE = 512
+_TOOL_CACHE: "OrderedDict[str, str]" = OrderedDict()
+_TOOL_CACHE_LOCK = asyncio.Lock()
+_TOOL_CACHE_STATS = {"hits": 0, "misses": 0}
+
+
+def _tool_cache_key(server: Optional[str], name: str, arguments: Dict[str, Any]) -> str:
+    """Build a cache key from the tool identity and canonical JSON arguments."""
+    args_hash = hashlib.blake2b(
+        json.dumps(arguments, sort_keys=True, default=str).encode(), digest_size=16
+    ).hexdigest()
+    return f"{server}:{name}:{args_hash}"
+
+
+def get_cache_stats() -> Dict[str, int]:
+    """Get MCP tool result cache statistics."""
+    return {
+        "hits": _TOOL_CACHE_STATS["hits"],
+        "misses": _TOOL_CACHE_STATS["misses"],
+        "size": len(_TOOL_CACHE),
+        "maxsize": _TOOL_CACHE_MAXSIZE,
+    }
+
+
+async def _cached_tool_result(key: str) -> Optional[str]:
+    """Look up a formatted tool result, counting the hit or miss."""
+    async with _TOOL_CACHE_LOCK:
+        cached = _TOOL_CACHE.get(key)
+        if cached is None:
+            _TOOL_CACHE_STATS["misses"] += 1
+            return None
+        _TOOL_CACHE.move_to_end(key)
+        _TOOL_CACHE_STATS["hits"] += 1
+        return cached
+
+
+async def _store_tool_result(key: str, output: str) -> None:
+    """Cache a formatted tool result, evicting the least recently used."""
+    async with _TOOL_CACHE_LOCK:
+        _TOOL_CACHE[key] = output
+        _TOOL_CACHE.move_to_end(key)
+        if len(_TOOL_CACHE) > _TOOL_CACHE_MAXSIZE:
+            _TOOL_CACHE.popitem(last=False)
+
+
+@lru_cache(maxsize=1)
+def _get_encoding():
+    """Get the tokenizer used for context budgeting, if it can be loaded."""
+    try:
+        return tiktoken.get_encoding("cl100k_base")
+    except Exception as e:
+        logger.warning(f"tiktoken encoding unavailable, estimating tokens: {e}")
+        return None
+
+
+def _render_messages(messages: List[BaseMessage]) -> str:
+    """Render messages as plain text for token counting and summarization."""
+    lines = []
+    for message in messages:
+        content = message.content if isinstance(message.content, str) else str(message.content)
+        tool_calls = getattr(message, "tool_calls", None)
+        if tool_calls:
+            content += "\n[tool calls: " + ", ".join(tc["name"] for tc in tool_calls) + "]"
+        lines.append(f"{message.type}: {content}")
+    return "\n\n".join(lines)
+
+
+def _count_tokens(text: str) -> int:
+    """Count tokens in text."""
+    encoding = _get_encoding()
+    if encoding is None:
+        return len(text) // 4  # Rough estimate
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def _resolve_api_key(model: str) -> str:
+    """Resolve the API key used for the given model."""
+    name = model.lower()
+
+    # Prefer OpenRouter if model looks like an OpenRouter namespace or the env var is set
+    if "/" in name or os.getenv("OPENROUTER_API_KEY"):
+        api_key = os.getenv("OPENROUTER_API_KEY", "")
+        if not api_key:
+            logger.warning("OPENROUTER_API_KEY is not set")
+            return "placeholder-key"
+        logger.info(f"Using OpenRouter API key for model {model}")
+        return api_key
+
+    if "anthropic" in name:
+        api_key = os.getenv("ANTHROPIC_API_KEY", "")
+        return api_key or "placeholder-key"
+
+    # Native OpenAI (no OpenRouter)
+    api_key = os.getenv("OPENAI_API_KEY", "")
+    return api_key or "placeholder-key"
+
+
+# Pydantic argument models built from MCP input schemas, keyed by schema hash
+_SCHEMA_CACHE: Dict[str, Type[BaseModel]] = {}
+
+_JSON_SCHEMA_TYPES = {
+    "string": str,
+    "integer": int,
+    "number": float,
+    "boolean": bool,
+    "array": list,
+    "object": dict,
+}
+
+
+def _args_schema_from_input_schema(name: str, schema: Dict[str, Any]) -> Optional[Type[BaseModel]]:
+    """Build, or reuse, a Pydantic model for an MCP tool's JSON input schema."""
+    properties = (schema or {}).get("properties")
+    if not properties:
+        return None
+    
+    key = hashlib.sha1(json.dumps(schema, sort_keys=True).encode()).hexdigest()
+    model = _SCHEMA_CACHE.get(key)
+    if model is not None:
+        return model
+    
+    required = set(schema.get("required", []))
+    fields = {}
+    for field_name, spec in properties.items():
+        json_type = spec.get("type")
+        annotation = _JSON_SCHEMA_TYPES.get(json_type, Any) if isinstance(json_type, str) else Any
+        description = spec.get("description")
+        if field_name in required:
+            fields[field_name] = (annotation, Field(..., description=description))
+        else:
+            fields[field_name] = (Optional[annotation], Field(spec.get("default"), description=description))
+    
+    try:
+        model = create_model(f"{name}_args", __config__=ConfigDict(extra="allow"), **fields)
+    except Exception as e:
+        logger.warning(f"Could not build args schema for tool {name}: {e}")
+        return None
+    
+    _SCHEMA_CACHE[key] = model
+    return model
+
+
+def _content_item_text(item: Any) -> str:
+    """Render one MCP content item, a dict or an mcp.types content object, as text."""
+    if isinstance(item, dict):
+        if item.get("type") == "text":
+            return item.get("text", "")
+    elif getattr(item, "type", None) == "text":
+        return item.text
+    return str(item)
+
+
+def _tool_error_message(tool_call: Dict[str, Any], content: str) -> ToolMessage:
+    """Build the error ToolMessage answering a tool call."""
+    return ToolMessage(
+        content=content,
+        tool_call_id=tool_call["id"],
+        name=tool_call["name"],
+        status="error",
+    )
 
 
 class MCPToolWrapper(BaseTool):
     """Wrapper to convert MCP tools to LangChain tools."""
     
-    # Pydantic fields
-    tool_info: Dict[str, Any]
-    mcp_manager: MCPManager
+    # Private attributes are not validated, so tool details and the manager
+    # are stored as-is on each wrapper
+    _tool_info: Dict[str, Any] = PrivateAttr()
+    _mcp_manager: Optional[MCPManager] = PrivateAttr(default=None)
     
-    def __init__(self, tool_info: Dict[str, Any], mcp_manager: MCPManager):
+    def __init__(self, tool_info: Dict[str, Any], mcp_manager: Optional[MCPManager]):
         # Extract tool details
         name = tool_info["name"]
         description = tool_info.get("description", f"MCP tool: {name}")
@@ -48,75 +315,158 @@ class MCPToolWrapper(BaseTool):
         super().__init__(
             name=f"{server}_{name}",
             description=f"[{server}] {description}",
-            args_schema=None,  # We'll handle this dynamically
-            tool_info=tool_info,
-            mcp_manager=mcp_manager,
+            args_schema=_args_schema_from_input_schema(name, tool_info.get("inputSchema")),
         )
+        self._tool_info = tool_info
+        self._mcp_manager = mcp_manager
+    
+    @property
+    def tool_info(self) -> Dict[str, Any]:
+        """MCP tool details for this wrapper."""
+        return self._tool_info
+    
+    @property
+    def mcp_manager(self) -> Optional[MCPManager]:
+        """MCP manager used to call the tool."""
+        return self._mcp_manager
     
     def _run(self, **kwargs) -> str:
         """Synchronous run method (not used in async context)."""
         raise NotImplementedError("Use async version")
     
+    def call_arguments(self, args: Dict[str, Any]) -> Dict[str, Any]:
+        """Validate tool-call arguments from the LLM the way tool invocation does."""
+        if self.args_schema is not None:
+            validated = self.args_schema.model_validate(args)
+            args = {key: getattr(validated, key) for key in args}
+        # Optional arguments the LLM left out are filled with None by the args schema
+        return {key: value for key, value in args.items() if value is not None}
+    
+    def cache_key(self, arguments: Dict[str, Any]) -> Optional[str]:
+        """Result cache key for a call, or None if the tool's results are not cached."""
+        tool_info = self.tool_info
+        # Servers opt tools out with _meta.cache_hint = "no-cache"
+        meta = tool_info.get("meta") or {}
+        if not tool_info.get("cacheable", True) or meta.get("cache_hint") == "no-cache":
+            return None
+        return _tool_cache_key(tool_info.get("server"), tool_info["name"], arguments)
+    
+    @staticmethod
+    def format_result(result: Dict[str, Any]) -> str:
+        """Render an MCP tool result as the text handed back to the LLM."""
+        if result.get("is_error"):
+            return f"Error: {result['content']}"
+        
+        content = result.get("content", [])
+        if isinstance(content, list):
+            if len(content) == 1:
+                return _content_item_text(content[0])
+            return "\n".join(_content_item_text(item) for item in content)
+        return str(content)
+    
     async def _arun(self, **kwargs) -> str:
         """Async run method."""
+        tool_info = self.tool_info
         try:
-            # Call the MCP tool with server info
-            server = self.tool_info.get("server")
-            result = await self.mcp_manager.call_tool(
-                self.tool_info["name"], 
-                kwargs,
-                server=server
-            )
+            server = tool_info.get("server")
             
-            # Format the result
-            if result.get("is_error"):
-                return f"Error: {result['content']}"
+            # Optional arguments the LLM left out are filled with None by the args schema
+            kwargs = {key: value for key, value in kwargs.items() if value is not None}
             
-            # Convert content to string
-            content = result.get("content", [])
-            if isinstance(content, list):
-                text_parts = []
-                for item in content:
-                    if isinstance(item, dict) and item.get("type") == "text":
-                        text_parts.append(item.get("text", ""))
-                    else:
-                        text_parts.append(str(item))
-                return "\n".join(text_parts)
-            else:
-                return str(content)
+            # Serve repeated calls of read-only tools from the cache
+            key = self.cache_key(kwargs)
+            if key is not None:
+                cached = await _cached_tool_result(key)
+                if cached is not None:
+                    return cached
+            
+            # Call the MCP tool with server info, within the server's concurrency limit
+            async with _server_semaphore(server):
+                result = await self.mcp_manager.call_tool(
+                    tool_info["name"],
+                    kwargs,
+                    server=server
+                )
+            
+            output = self.format_result(result)
+            if key is not None:
+                await _store_tool_result(key, output)
+            
+            return output
                 
         except Exception as e:
-            logger.error(f"Error calling MCP tool {self.tool_info['name']}: {e}")
+            logger.error(f"Error calling MCP tool {tool_info['name']}: {e}")
             return f"Error calling tool: {str(e)}"
 
 
 class AuditAgent:
     """Smart contract audit agent using LangGraph and MCP tools."""
     
+    _SYSTEM_PROMPT_TEMPLATE = """You are an expert smart contract auditor with access to various tools for comprehensive analysis.
+
+TASK: Perform a security audit of the provided smart contract code.
+
+AUDIT PROFILE: {audit_profile}
+JOB ID: {job_id}
+
+AVAILABLE TOOLS: {tool_count} tools available
+- Use tools to gather additional information, analyze code, check vulnerabilities, etc.
+- You can use multiple tools in sequence or parallel as needed
+- Each tool call should be purposeful and contribute to the audit
+
+AUDIT PROCESS:
+1. Analyze the contract code for security vulnerabilities
+2. Check for compliance with standards (ERC20, ERC721, etc.)
+3. Look for common issues: reentrancy, overflow, access control, etc.
+4. Use tools to gather additional context if needed
+5. Generate a comprehensive audit report
+
+REPORT FORMAT:
+- Executive Summary
+- Detailed Findings (with severity levels)
+- Code locations and explanations
+- Specific recommendations
+- Risk assessment
+
+Be thorough, accurate, and provide actionable recommendations."""
+    
     def __init__(self, config: MCPConfig, mcp_manager: Optional[MCPManager] = None):
         self.config = config
         self.agent_config = config.agent
         self.mcp_manager = mcp_manager
         
+        # Anthropic models (direct or via OpenRouter) only cache prefixes marked explicitly
+        model_name = self.agent_config.model.lower()
+        self.prompt_caching = "anthropic" in model_name or "claude" in model_name
+        
+        # Resolve the API key once; the fast path sends it on every turn
+        self._api_key = self._get_api_key()
+        
         # Initialize LLM
         self.llm = self._create_llm()
         
         # Initialize tools
         self.tools: List[BaseTool] = []
         self.tool_node: Optional[ToolNode] = None
+        self.tools_by_name: Dict[str, BaseTool] = {}
+        self.openai_tools: List[Dict[str, Any]] = []
+        self.tool_semaphore: Optional[asyncio.Semaphore] = None
+        
+        # System messages per (job_id, audit_profile) for in-flight audits
+        self._system_message_cache: Dict[tuple[str, str], SystemMessage] = {}
         
         # Initialize graph
         self.graph: Optional[StateGraph] = None
         self.app = None
         
-        # Memory for conversation
-        self.memory = MemorySaver()
+        # Checkpointer for conversation state; opened in initialize()
+        self.memory = None
+        self._checkpointer_context = None
     
     def _create_llm(self):
         """Create the LLM instance based on configuration."""
-        import os
         model_name = self.agent_config.model
-        api_key = self._get_api_key()
+        api_key = self._api_key
         
         # Если это OpenRouter (часто содержит '/') или есть OPENROUTER_API_KEY, используем OpenAI-совместимый клиент
         if "/" in model_name or os.getenv("OPENROUTER_API_KEY"):
@@ -126,6 +476,7 @@ class AuditAgent:
                 max_tokens=self.agent_config.max_tokens,
                 api_key=api_key,
                 base_url="https://openrouter.ai/api/v1",
+                http_async_client=get_shared_http_client(),
             )
         # Иначе – прямые SDK, как было
         elif "anthropic" in model_name.lower():
@@ -141,6 +492,7 @@ class AuditAgent:
                 temperature=self.agent_config.temperature,
                 max_tokens=self.agent_config.max_tokens,
                 api_key=api_key,
+                http_async_client=get_shared_http_client(),
             )
         else:
             # Default to OpenAI-compatible
@@ -150,29 +502,12 @@ class AuditAgent:
                 max_tokens=self.agent_config.max_tokens,
                 api_key=api_key,
                 base_url="https://openrouter.ai/api/v1",
+                http_async_client=get_shared_http_client(),
             )
     
     def _get_api_key(self) -> str:
         """Get API key for the LLM."""
-        import os
-        name = self.agent_config.model.lower()
-
-        # Prefer OpenRouter if model looks like an OpenRouter namespace or the env var is set
-        if "/" in name or os.getenv("OPENROUTER_API_KEY"):
-            api_key = os.getenv("OPENROUTER_API_KEY", "")
-            if not api_key:
-                logger.warning("OPENROUTER_API_KEY is not set")
-                return "placeholder-key"
-            logger.info(f"Using OpenRouter API key for model {self.agent_config.model}")
-            return api_key
-
-        if "anthropic" in name:
-            api_key = os.getenv("ANTHROPIC_API_KEY", "")
-            return api_key or "placeholder-key"
-
-        # Native OpenAI (no OpenRouter)
-        api_key = os.getenv("OPENAI_API_KEY", "")
-        return api_key or "placeholder-key"
+        return _resolve_api_key(self.agent_config.model)
     
     def _setup_tools(self):
         """Setup MCP tools as LangChain tools."""
@@ -192,9 +527,14 @@ class AuditAgent:
             except Exception as e:
                 logger.error(f"Failed to create tool wrapper for {tool_info['name']}: {e}")
         
+        # Cached system messages embed the tool count
+        self._system_message_cache.clear()
+        
         # Create tool node and bind tools to LLM
         if self.tools:
             self.tool_node = ToolNode(self.tools)
+            self.tools_by_name = {tool.name: tool for tool in self.tools}
+            self.openai_tools = [convert_to_openai_tool(tool) for tool in self.tools]
             # ВАЖНО: Привязываем инструменты к LLM
             self.llm_with_tools = self.llm.bind_tools(self.tools)
             logger.info(f"Setup {len(self.tools)} MCP tools and bound to LLM")
@@ -209,6 +549,10 @@ class AuditAgent:
             self._create_simple_graph()
             return
         
+        if self.agent_config.enable_parallel_tools:
+            self._create_parallel_graph()
+            return
+        
         # Create state graph
         self.graph = StateGraph(AgentState)
         
@@ -237,6 +581,34 @@ class AuditAgent:
         
         logger.info("Created LangGraph with ReAct pattern")
     
+    def _create_parallel_graph(self):
+        """Create a graph that fans tool calls out to concurrent workers."""
+        self.tool_semaphore = asyncio.Semaphore(self.agent_config.max_parallel_tools)
+        
+        self.graph = StateGraph(AgentState)
+        
+        # The tool calls of an agent turn are split per MCP server into
+        # tool_worker tasks, each sending its calls as one batch request;
+        # the add_messages reducer merges their ToolMessages back into state.
+        self.graph.add_node("agent", self._agent_node)
+        self.graph.add_node("tool_worker", self._tool_worker_node)
+        
+        self.graph.add_edge("tool_worker", "agent")
+        self.graph.add_conditional_edges(
+            "agent",
+            self._dispatch_tool_calls,
+            ["tool_worker", "agent", END],
+        )
+        
+        self.graph.set_entry_point("agent")
+        
+        self.app = self.graph.compile(checkpointer=self.memory)
+        
+        logger.info(
+            f"Created LangGraph with parallel tool dispatch "
+            f"(max_parallel_tools={self.agent_config.max_parallel_tools})"
+        )
+    
     def _create_simple_graph(self):
         """Create a simple graph without tools."""
         self.graph = StateGraph(AgentState)
@@ -255,71 +627,154 @@ class AuditAgent:
         
         logger.info("Created simple graph without tools")
     
-    async def _agent_node(self, state: AgentState) -> AgentState:
-        """Agent node that decides what to do next."""
-        messages = state["messages"]
+    async def _agent_node(self, state: AgentState) -> Dict[str, Any]:
+        """Agent node that decides what to do next; returns only the changed keys."""
         iteration = state["iteration"]
         max_iterations = state["max_iterations"]
         
         # Check if we've exceeded max iterations
         if iteration >= max_iterations:
             logger.warning(f"Max iterations ({max_iterations}) reached")
-            state["error"] = f"Max iterations ({max_iterations}) reached"
-            return state
+            return {"error": f"Max iterations ({max_iterations}) reached"}
         
         # Create system message with context
         system_message = self._create_system_message(state)
         
-        # Prepare messages for LLM
-        llm_messages = [system_message] + messages
-        
         try:
+            # Prepare messages for LLM
+            windowed, summary_update = await self._windowed_messages(state)
+            llm_messages = [system_message] + windowed
+            
             # Get response from LLM with tools
-            response = await self.llm_with_tools.ainvoke(llm_messages)
+            response = None
+            if self.agent_config.fast_path and isinstance(self.llm, ChatOpenAI):
+                try:
+                    response = await self._fast_chat_completion(llm_messages)
+                except Exception as e:
+                    logger.warning(f"Fast chat completion failed, using LangChain: {e}")
+            if response is None:
+                response = await self.llm_with_tools.ainvoke(llm_messages)
+            
+            # The add_messages reducer appends the response to the history
+            update: Dict[str, Any] = {"messages": [response], "iteration": iteration + 1}
             
-            # Add AI message to state
-            messages.append(response)
-            state["messages"] = messages
-            state["iteration"] = iteration + 1
+            # Persist a new running summary, if one was produced this turn
+            update.update(summary_update)
             
-            # Track tool usage
-            if hasattr(response, "tool_calls") and response.tool_calls:
-                for tool_call in response.tool_calls:
-                    tool_name = tool_call["name"]
-                    if tool_name not in state["tools_used"]:
-                        state["tools_used"].append(tool_name)
+            # Track tool usage (the reducer unions the sets); a reply without
+            # tool calls is the final report
+            if getattr(response, "tool_calls", None):
+                update["tools_used"] = {tool_call["name"] for tool_call in response.tool_calls}
+            else:
+                update["final_report"] = response.text
+                update["done"] = True
             
             logger.info(f"Agent iteration {iteration + 1} completed")
+            return update
             
         except Exception as e:
             logger.error(f"Error in agent node: {e}")
-            state["error"] = str(e)
+            return {"error": str(e)}
+    
+    async def _fast_chat_completion(self, messages: List[BaseMessage]) -> AIMessage:
+        """Call the chat completions endpoint directly on the shared HTTP pool."""
+        payload = {
+            "model": self.agent_config.model,
+            "messages": convert_to_openai_messages(messages),
+            "temperature": self.agent_config.temperature,
+            "max_tokens": self.agent_config.max_tokens,
+        }
+        if self.openai_tools:
+            payload["tools"] = self.openai_tools
+        
+        base_url = (self.llm.openai_api_base or "https://api.openai.com/v1").rstrip("/")
+        response = await get_shared_http_client().post(
+            f"{base_url}/chat/completions",
+            content=orjson.dumps(payload),
+            headers={
+                "Authorization": f"Bearer {self._api_key}",
+                "Content-Type": "application/json",
+            },
+        )
+        response.raise_for_status()
         
-        return state
+        message = orjson.loads(response.content)["choices"][0]["message"]
+        tool_calls = [
+            {
+                "name": call["function"]["name"],
+                "args": orjson.loads(call["function"].get("arguments") or "{}"),
+                "id": call["id"],
+            }
+            for call in message.get("tool_calls") or []
+        ]
+        return AIMessage(content=message.get("content") or "", tool_calls=tool_calls)
     
-    async def _simple_agent_node(self, state: AgentState) -> AgentState:
-        """Simple agent node without tools."""
+    async def _windowed_messages(self, state: AgentState) -> Tuple[List[BaseMessage], Dict[str, Any]]:
+        """Keep the audit request, a running summary and the most recent messages.
+        
+        Returns the messages to send and the state keys to update when a new
+        summary was produced (empty otherwise). The state is not modified.
+        """
         messages = state["messages"]
+        window = self.agent_config.window_size
+        
+        # The first message carries the contract code and is always kept
+        if len(messages) <= window + 1:
+            return messages, {}
+        first, rest = messages[0], messages[1:]
+        
+        # Never start the window on a tool result separated from its tool call
+        split = len(rest) - window
+        while split > 0 and isinstance(rest[split], ToolMessage):
+            split -= 1
+        
+        summarized = state.get("summarized_count") or 0
+        context_summary = state.get("context_summary")
+        pending, tail = rest[summarized:split], rest[split:]
+        summary_update: Dict[str, Any] = {}
         
+        if _count_tokens(_render_messages(pending)) > self.agent_config.summary_token_budget:
+            previous = context_summary
+            prompt = "Summarize the prior audit context below. Keep every finding, code location and tool result that matters for the final report."
+            history = _render_messages(pending)
+            if previous:
+                history = f"Earlier summary:\n{previous}\n\n{history}"
+            summary = await self.llm.ainvoke([SystemMessage(content=prompt), HumanMessage(content=history)])
+            context_summary, summarized = summary.content, split
+            summary_update = {"context_summary": context_summary, "summarized_count": summarized}
+            pending = []
+            logger.info(f"Summarized {split} earlier messages for job {state['job_id']}")
+        
+        windowed = []
+        if summarized and context_summary:
+            windowed.append(SystemMessage(content=f"Summary of earlier audit context:\n{context_summary}"))
+        return windowed + [first] + pending + tail, summary_update
+    
+    async def _simple_agent_node(self, state: AgentState) -> Dict[str, Any]:
+        """Simple agent node without tools; returns only the changed keys."""
         # Create system message
         system_message = self._create_system_message(state)
         
         # Prepare messages for LLM
-        llm_messages = [system_message] + messages
+        llm_messages = [system_message] + state["messages"]
         
         try:
-            # Get response from LLM
-            response = await self.llm.ainvoke(llm_messages)
-            
-            # Add AI message to state
-            messages.append(response)
-            state["messages"] = messages
-            
-            # Generate final report
-            state["final_report"] = response.content
+            # Stream the response so live report subscribers see tokens as they arrive;
+            # .text joins the text blocks of list content (e.g. ChatAnthropic)
+            response = None
+            async for chunk in self.llm.astream(llm_messages):
+                text = chunk.text
+                if text:
+                    publish_report_chunk(state["job_id"], text)
+                response = chunk if response is None else response + chunk
+            if response is None:
+                response = AIMessage(content="")
             
             logger.info("Simple agent completed")
             
+            # The add_messages reducer appends the response to the history
+            return {"messages": [response], "final_report": response.text}
+            
         except Exception as e:
             error_msg = str(e)
             logger.error(f"Error in simple agent node: {error_msg}")
@@ -327,72 +782,122 @@ class AuditAgent:
             # Check if it's an authentication error
             if "authentication" in error_msg.lower() or "api_key" in error_msg.lower():
                 logger.warning("Authentication error detected, this should trigger fallback to direct LLM")
-                state["error"] = f"Agent authentication failed: {error_msg}"
-            else:
-                state["error"] = error_msg
-        
-        return state
+                return {"error": f"Agent authentication failed: {error_msg}"}
+            return {"error": error_msg}
+    
+    def _cacheable_content(self, text: str):
+        """Mark text as a prompt-cache breakpoint when the model needs explicit hints."""
+        if not self.prompt_caching:
+            return text
+        return [{"type": "text", "text": text, "cache_control": {"type": "ephemeral"}}]
     
     def _create_system_message(self, state: AgentState) -> BaseMessage:
         """Create system message with context."""
-        audit_profile = state["audit_profile"]
-        job_id = state["job_id"]
+        key = (state["job_id"], state["audit_profile"])
         
-        system_prompt = f"""You are an expert smart contract auditor with access to various tools for comprehensive analysis.
-
-TASK: Perform a security audit of the provided smart contract code.
-
-AUDIT PROFILE: {audit_profile}
-JOB ID: {job_id}
-
-AVAILABLE TOOLS: {len(self.tools)} tools available
-- Use tools to gather additional information, analyze code, check vulnerabilities, etc.
-- You can use multiple tools in sequence or parallel as needed
-- Each tool call should be purposeful and contribute to the audit
-
-AUDIT PROCESS:
-1. Analyze the contract code for security vulnerabilities
-2. Check for compliance with standards (ERC20, ERC721, etc.)
-3. Look for common issues: reentrancy, overflow, access control, etc.
-4. Use tools to gather additional context if needed
-5. Generate a comprehensive audit report
-
-REPORT FORMAT:
-- Executive Summary
-- Detailed Findings (with severity levels)
-- Code locations and explanations
-- Specific recommendations
-- Risk assessment
-
-Be thorough, accurate, and provide actionable recommendations."""
-
-        return SystemMessage(content=system_prompt)
+        system_message = self._system_message_cache.get(key)
+        if system_message is None:
+            system_prompt = self._SYSTEM_PROMPT_TEMPLATE.format_map({
+                "audit_profile": state["audit_profile"],
+                "job_id": state["job_id"],
+                "tool_count": len(self.tools),
+            })
+            system_message = SystemMessage(content=self._cacheable_content(system_prompt))
+            self._system_message_cache[key] = system_message
+        
+        return system_message
+    
+    async def _tool_worker_node(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """Execute the tool calls of an agent turn that go to one MCP server."""
+        async with self.tool_semaphore:
+            messages = await self._run_tool_batch(payload["tool_calls"])
+        return {"messages": messages}
+    
+    async def _run_tool_batch(self, tool_calls: List[Dict[str, Any]]) -> List[ToolMessage]:
+        """Answer cached calls locally and send the rest to their server in one batch."""
+        messages: Dict[str, ToolMessage] = {}
+        pending = []
+        for tool_call in tool_calls:
+            tool = self.tools_by_name.get(tool_call["name"])
+            if tool is None:
+                messages[tool_call["id"]] = _tool_error_message(
+                    tool_call, f"Error: tool '{tool_call['name']}' is not available"
+                )
+                continue
+            
+            try:
+                arguments = tool.call_arguments(tool_call["args"])
+            except Exception as e:
+                messages[tool_call["id"]] = _tool_error_message(tool_call, f"Error calling tool: {str(e)}")
+                continue
+            
+            key = tool.cache_key(arguments)
+            cached = await _cached_tool_result(key) if key is not None else None
+            if cached is not None:
+                messages[tool_call["id"]] = ToolMessage(
+                    content=cached, tool_call_id=tool_call["id"], name=tool_call["name"]
+                )
+                continue
+            pending.append((tool_call, tool, arguments, key))
+        
+        if pending:
+            server = pending[0][1].tool_info.get("server")
+            calls = [(tool.tool_info["name"], arguments, server) for _, tool, arguments, _ in pending]
+            try:
+                async with _server_semaphore(server):
+                    results = await self.mcp_manager.call_tools(calls)
+            except Exception as e:
+                logger.error(f"Tool batch for server {server} failed: {e}")
+                results = [e] * len(pending)
+            
+            for (tool_call, tool, _, key), result in zip(pending, results):
+                if isinstance(result, Exception):
+                    messages[tool_call["id"]] = _tool_error_message(tool_call, f"Error calling tool: {str(result)}")
+                    continue
+                output = tool.format_result(result)
+                if key is not None:
+                    await _store_tool_result(key, output)
+                messages[tool_call["id"]] = ToolMessage(
+                    content=output, tool_call_id=tool_call["id"], name=tool_call["name"]
+                )
+        
+        return [messages[tool_call["id"]] for tool_call in tool_calls]
+    
+    def _dispatch_tool_calls(self, state: AgentState):
+        """Route agent output to parallel tool workers, back to the agent, or END."""
+        if self._should_continue(state) == "end":
+            return END
+        
+        last_message = state["messages"][-1]
+        tool_calls = getattr(last_message, "tool_calls", None)
+        if not tool_calls:
+            return "agent"
+        
+        # One worker per MCP server, so each server gets the turn's calls as one batch
+        by_server: Dict[Optional[str], List[Dict[str, Any]]] = {}
+        for tool_call in tool_calls:
+            tool = self.tools_by_name.get(tool_call["name"])
+            server = tool.tool_info.get("server") if tool is not None else None
+            by_server.setdefault(server, []).append(tool_call)
+        
+        return [Send("tool_worker", {"tool_calls": calls}) for calls in by_server.values()]
     
     def _should_continue(self, state: AgentState) -> str:
         """Decide whether to continue or end."""
         messages = state["messages"]
         
-        if not messages:
-            return "end"
-        
-        last_message = messages[-1]
-        
-        # Check if there's an error
-        if state.get("error"):
+        # The agent node marks the audit done once the LLM stops calling tools
+        if not messages or state.get("done") or state.get("error"):
             return "end"
         
         # Check if we have tool calls
-        if hasattr(last_message, "tool_calls") and last_message.tool_calls:
+        if getattr(messages[-1], "tool_calls", None):
             return "continue"
         
         # Check if we've reached max iterations
         if state["iteration"] >= state["max_iterations"]:
             return "end"
         
-        # Check if the agent seems to be done
-        if "final report" in last_message.content.lower() or "audit complete" in last_message.content.lower():
-            return "end"
-        
         # Default to continue for now
         return "continue"
     
@@ -409,7 +914,9 @@ Be thorough, accurate, and provide actionable recommendations."""
         # Initialize state
         initial_state = AgentState(
             messages=[
-                HumanMessage(content=f"Please audit this smart contract code:\n\n```solidity\n{code}\n```")
+                HumanMessage(content=self._cacheable_content(
+                    f"Please audit this smart contract code:\n\n```solidity\n{code}\n```"
+                ))
             ],
             current_task="smart_contract_audit",
             audit_code=code,
@@ -417,9 +924,12 @@ Be thorough, accurate, and provide actionable recommendations."""
             job_id=job_id,
             iteration=0,
             max_iterations=self.agent_config.max_iterations,
-            tools_used=[],
+            tools_used=set(),
             final_report=None,
+            done=False,
             error=None,
+            context_summary=None,
+            summarized_count=0,
         )
         
         try:
@@ -427,11 +937,18 @@ Be thorough, accurate, and provide actionable recommendations."""
             if self.app:
                 # Use thread_id for conversation memory
                 thread_id = f"audit_{job_id}"
+                config = {"configurable": {"thread_id": thread_id}}
                 
-                result = await self.app.ainvoke(
-                    initial_state,
-                    config={"configurable": {"thread_id": thread_id}}
-                )
+                # Resume an interrupted run from its last checkpoint; a finished
+                # run for the same job is discarded so the audit starts fresh
+                snapshot = await self.app.aget_state(config)
+                if snapshot.next:
+                    logger.info(f"Resuming audit for job {job_id} from checkpoint")
+                    result = await self.app.ainvoke(None, config=config)
+                else:
+                    if snapshot.values:
+                        await self.memory.adelete_thread(thread_id)
+                    result = await self.app.ainvoke(initial_state, config=config)
                 
                 # Extract final report
                 final_report = result.get("final_report", "")
@@ -447,15 +964,16 @@ Be thorough, accurate, and provide actionable recommendations."""
                         final_report = last_ai_message.content
                 
                 # Calculate metrics
+                tools_used = sorted(result.get("tools_used", ()))
                 metrics = {
-                    "calls": len(result.get("tools_used", [])),
+                    "calls": len(tools_used),
                     "prompt_tokens": 0,  # Would need to calculate from messages
                     "completion_tokens": 0,  # Would need to calculate from messages
                     "elapsed_sec": 0,  # Would need to track time
                     "model": self.agent_config.model,
                     "cost_usd": 0.0,  # Would need to calculate
                     "iterations": result.get("iteration", 0),
-                    "tools_used": result.get("tools_used", []),
+                    "tools_used": tools_used,
                 }
                 
                 return {
@@ -482,11 +1000,34 @@ Be thorough, accurate, and provide actionable recommendations."""
                 },
                 "error": str(e),
             }
+        finally:
+            self._system_message_cache.pop((job_id, audit_profile), None)
+    
+    async def _open_checkpointer(self):
+        """Open the persistent checkpointer, falling back to in-process memory."""
+        path = settings.checkpoint_db_path
+        if not path:
+            return MemorySaver()
+        
+        try:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._checkpointer_context = AsyncSqliteSaver.from_conn_string(path)
+            saver = await self._checkpointer_context.__aenter__()
+            logger.info(f"Persisting agent checkpoints to {path}")
+            return saver
+        except Exception as e:
+            logger.warning(f"Failed to open checkpoint database {path}, using memory: {e}")
+            self._checkpointer_context = None
+            return MemorySaver()
     
     async def initialize(self):
         """Initialize the agent."""
         logger.info("Initializing audit agent...")
         
+        self.memory = await self._open_checkpointer()
+        
         # Setup tools
         self._setup_tools()
         
@@ -498,34 +1039,60 @@ Be thorough, accurate, and provide actionable recommendations."""
     async def cleanup(self):
         """Cleanup agent resources."""
         logger.info("Cleaning up audit agent...")
-        # Any cleanup needed
-        pass
+        if self._checkpointer_context is not None:
+            await self._checkpointer_context.__aexit__(None, None, None)
+            self._checkpointer_context = None
+
 
+# Initialized agents keyed by (model, API key hash)
+_AGENT_CACHE: Dict[tuple[str, str], AuditAgent] = {}
+_CACHE_LOCK = asyncio.Lock()
+_CACHE_STATS = {"hits": 0, "misses": 0, "init_ms": 0.0}
 
-# Global agent instance
+# Most recently initialized agent
 audit_agent: Optional[AuditAgent] = None
 
 
+def get_agent_cache_stats() -> Dict[str, Any]:
+    """Get audit agent cache statistics."""
+    return {**_CACHE_STATS, "size": len(_AGENT_CACHE)}
+
+
 async def get_audit_agent() -> Optional[AuditAgent]:
     """Get the global audit agent instance."""
     return audit_agent
 
 
 async def initialize_audit_agent(config: MCPConfig, mcp_manager: Optional[MCPManager] = None) -> AuditAgent:
-    """Initialize the global audit agent."""
+    """Get a cached audit agent for the configured model, initializing it on first use."""
     global audit_agent
     
-    if audit_agent is None:
-        audit_agent = AuditAgent(config, mcp_manager)
-        await audit_agent.initialize()
+    api_key = _resolve_api_key(config.agent.model)
+    key = (config.agent.model, hashlib.sha256(api_key.encode()).hexdigest()[:16])
     
-    return audit_agent
+    async with _CACHE_LOCK:
+        agent = _AGENT_CACHE.get(key)
+        if agent is not None:
+            _CACHE_STATS["hits"] += 1
+        else:
+            _CACHE_STATS["misses"] += 1
+            start = time.perf_counter()
+            agent = AuditAgent(config, mcp_manager)
+            await agent.initialize()
+            _CACHE_STATS["init_ms"] += (time.perf_counter() - start) * 1000
+            _AGENT_CACHE[key] = agent
+    
+    audit_agent = agent
+    return agent
 
 
 async def shutdown_audit_agent():
-    """Shutdown the global audit agent."""
+    """Shutdown all cached audit agents."""
     global audit_agent
     
-    if audit_agent:
-        await audit_agent.cleanup()
-        audit_agent = None
+    async with _CACHE_LOCK:
+        for agent in _AGENT_CACHE.values():
+            await agent.cleanup()
+        _AGENT_CACHE.clear()
+    
+    audit_agent = None
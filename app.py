@@ -1,22 +1,34 @@
 """Main FastAPI application for the audit agent."""
 
-import json
+import asyncio
 import signal
 import sys
 from contextlib import asynccontextmanager
+from typing import List, Optional
 
 from fastapi import FastAPI, HTTPException, Depends, status
-from fastapi.responses import PlainTextResponse
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from loguru import logger
-from sqlalchemy.orm import Session
-
-from db import get_db, JobRepository, init_db, check_db_health
-from llm_client import llm_client
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from agent import (
+    close_report_stream,
+    close_shared_http_client,
+    get_agent_cache_stats,
+    get_cache_stats,
+    open_report_stream,
+    release_report_stream,
+    warm_shared_http_client,
+)
+from db import get_db, AsyncJobRepository, async_engine, init_db, check_db_health
+from llm_client import close_llm_client
 from mcp_manager import get_mcp_manager
 from schemas import (
     CreateJobRequest,
     CreateJobResponse,
     JobStatusResponse,
+    JobStatusManyRequest,
+    JobStatusManyResponse,
     HealthResponse,
     CancelJobResponse,
     ProgressInfo,
@@ -50,12 +62,18 @@ async def lifespan(app: FastAPI):
     await scheduler.start()
     logger.info("Scheduler started")
 
+    # Pre-warm the LLM connection pool
+    if not settings.dry_run:
+        await warm_shared_http_client()
+
     yield
 
     # Cleanup
     logger.info("Shutting down audit agent application")
     await scheduler.stop()
-    await llm_client.close()
+    await close_llm_client()
+    await close_shared_http_client()
+    await async_engine.dispose()
     logger.info("Application shutdown complete")
 
 
@@ -96,107 +114,211 @@ async def mcp_debug():
     }
 
 
+@app.get("/cache-stats")
+async def cache_stats():
+    """Inspect audit agent and MCP tool result cache statistics."""
+    return {"agents": get_agent_cache_stats(), "tools": get_cache_stats()}
+
+
+def _new_job_row(
+    job_id: str, request: CreateJobRequest, payload: dict, queued_at: str
+) -> dict:
+    """Build the column values of a newly queued job."""
+    return {
+        "job_id": job_id,
+        "status": "queued",
+        "queued_at": queued_at,
+        "progress_phase": "preflight",
+        "progress_percent": 0,
+        "payload_json": payload,
+        "idempotency_key": request.idempotency_key,
+    }
+
+
+def _existing_job_response(job) -> CreateJobResponse:
+    """Describe a job that already exists for an idempotent create."""
+    return CreateJobResponse(
+        job_id=job.job_id,
+        status=job.status,
+        created_at=job.queued_at,
+        links=JobLinks(
+            self=f"/jobs/{job.job_id}",
+            report=(
+                f"/jobs/{job.job_id}/report" if job.status == "succeeded" else None
+            ),
+        ),
+    )
+
+
+async def _create_job_record(
+    repo: AsyncJobRepository, request: CreateJobRequest
+) -> CreateJobResponse:
+    """Create a queued job for the request, honouring its idempotency key."""
+    # Check for idempotency
+    if request.idempotency_key:
+        existing_job = await repo.get_job_by_idempotency_key(request.idempotency_key)
+        if existing_job:
+            logger.info(
+                f"Returning existing job for idempotency key: {request.idempotency_key}"
+            )
+            return _existing_job_response(existing_job)
+
+    # Generate job ID
+    payload = request.model_dump()
+    job_id = generate_job_id(payload, request.idempotency_key)
+
+    # Create job record
+    job_data = _new_job_row(job_id, request, payload, get_current_timestamp())
+
+    job = await repo.create_job(job_data)
+
+    logger.info(f"Created job {job_id} with status {job.status}")
+
+    return CreateJobResponse(
+        job_id=job.job_id,
+        status=job.status,
+        created_at=job.queued_at,
+        links=JobLinks(self=f"/jobs/{job.job_id}", report=f"/jobs/{job.job_id}/report"),
+    )
+
+
 @app.post(
     "/jobs", response_model=CreateJobResponse, status_code=status.HTTP_201_CREATED
 )
-async def create_job(request: CreateJobRequest, db: Session = Depends(get_db)):
+async def create_job(request: CreateJobRequest, db: AsyncSession = Depends(get_db)):
     """Create a new audit job."""
     try:
-        repo = JobRepository(db)
-
-        # Check for idempotency
-        if request.idempotency_key:
-            existing_job = repo.get_job_by_idempotency_key(request.idempotency_key)
-            if existing_job:
-                logger.info(
-                    f"Returning existing job for idempotency key: {request.idempotency_key}"
-                )
-                return CreateJobResponse(
-                    job_id=existing_job.job_id,
-                    status=existing_job.status,
-                    created_at=existing_job.queued_at,
-                    links=JobLinks(
-                        self=f"/jobs/{existing_job.job_id}",
-                        report=(
-                            f"/jobs/{existing_job.job_id}/report"
-                            if existing_job.status == "succeeded"
-                            else None
+        repo = AsyncJobRepository(db)
+        return await _create_job_record(repo, request)
+
+    except Exception as e:
+        logger.error(f"Error creating job: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to create job: {str(e)}",
+        )
+
+
+@app.post(
+    "/jobs/batch",
+    response_model=List[CreateJobResponse],
+    status_code=status.HTTP_201_CREATED,
+)
+async def create_jobs_batch(
+    requests: List[CreateJobRequest], db: AsyncSession = Depends(get_db)
+):
+    """Create several audit jobs in one request."""
+    try:
+        repo = AsyncJobRepository(db)
+
+        # Job IDs derive from the idempotency key or payload, so one lookup
+        # finds every job that already exists for this batch
+        payloads = [request.model_dump() for request in requests]
+        job_ids = [
+            generate_job_id(payload, request.idempotency_key)
+            for request, payload in zip(requests, payloads)
+        ]
+        existing_jobs = await repo.get_jobs(job_ids)
+
+        queued_at = get_current_timestamp()
+        new_rows = {}
+        for job_id, request, payload in zip(job_ids, requests, payloads):
+            if job_id not in existing_jobs and job_id not in new_rows:
+                new_rows[job_id] = _new_job_row(job_id, request, payload, queued_at)
+
+        await repo.create_jobs(list(new_rows.values()))
+        logger.info(
+            f"Created {len(new_rows)} jobs in batch of {len(requests)} requests"
+        )
+
+        responses = []
+        for job_id in job_ids:
+            if job_id in existing_jobs:
+                responses.append(_existing_job_response(existing_jobs[job_id]))
+            else:
+                responses.append(
+                    CreateJobResponse(
+                        job_id=job_id,
+                        status="queued",
+                        created_at=queued_at,
+                        links=JobLinks(
+                            self=f"/jobs/{job_id}", report=f"/jobs/{job_id}/report"
                         ),
-                    ),
+                    )
                 )
+        return responses
+
+    except Exception as e:
+        logger.error(f"Error creating job batch: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to create jobs: {str(e)}",
+        )
 
-        # Generate job ID
-        job_id = generate_job_id(request.dict(), request.idempotency_key)
-
-        # Create job record
-        job_data = {
-            "job_id": job_id,
-            "status": "queued",
-            "queued_at": get_current_timestamp(),
-            "progress_phase": "preflight",
-            "progress_percent": 0,
-            "payload_json": json.dumps(request.dict()),
-            "idempotency_key": request.idempotency_key,
-        }
-
-        job = repo.create_job(job_data)
-
-        logger.info(f"Created job {job_id} with status {job.status}")
-
-        return CreateJobResponse(
-            job_id=job.job_id,
-            status=job.status,
-            created_at=job.queued_at,
-            links=JobLinks(
-                self=f"/jobs/{job.job_id}", report=f"/jobs/{job.job_id}/report"
+
+def _job_status_response(job) -> JobStatusResponse:
+    """Describe a job's status, progress and metrics."""
+    # Parse metrics if available
+    metrics = None
+    if job.metrics_json:
+        try:
+            metrics = MetricsInfo(**job.metrics_json)
+        except Exception as e:
+            logger.warning(f"Failed to parse metrics for job {job.job_id}: {e}")
+
+    # Create progress info
+    progress = ProgressInfo(phase=job.progress_phase, percent=job.progress_percent)
+
+    return JobStatusResponse(
+        job_id=job.job_id,
+        status=job.status,
+        progress=progress,
+        metrics=metrics,
+        error_message=job.error_message,
+        links=JobLinks(
+            self=f"/jobs/{job.job_id}",
+            report=(
+                f"/jobs/{job.job_id}/report" if job.status == "succeeded" else None
             ),
+        ),
+    )
+
+
+@app.post("/jobs/status_many", response_model=JobStatusManyResponse)
+async def get_jobs_status(
+    request: JobStatusManyRequest, db: AsyncSession = Depends(get_db)
+):
+    """Get the status of several jobs with one lookup."""
+    try:
+        repo = AsyncJobRepository(db)
+        jobs = await repo.get_jobs(request.job_ids)
+
+        return JobStatusManyResponse(
+            jobs={job_id: _job_status_response(job) for job_id, job in jobs.items()},
+            missing=[job_id for job_id in request.job_ids if job_id not in jobs],
         )
 
     except Exception as e:
-        logger.error(f"Error creating job: {e}")
+        logger.error(f"Error getting job statuses: {e}")
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Failed to create job: {str(e)}",
+            detail=f"Failed to get job statuses: {str(e)}",
         )
 
 
 @app.get("/jobs/{job_id}", response_model=JobStatusResponse)
-async def get_job_status(job_id: str, db: Session = Depends(get_db)):
+async def get_job_status(job_id: str, db: AsyncSession = Depends(get_db)):
     """Get job status and progress."""
     try:
-        repo = JobRepository(db)
-        job = repo.get_job(job_id)
+        repo = AsyncJobRepository(db)
+        job = await repo.get_job(job_id)
 
         if not job:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND, detail="Job not found"
             )
 
-        # Parse metrics if available
-        metrics = None
-        if job.metrics_json:
-            try:
-                metrics_data = json.loads(job.metrics_json)
-                metrics = MetricsInfo(**metrics_data)
-            except Exception as e:
-                logger.warning(f"Failed to parse metrics for job {job_id}: {e}")
-
-        # Create progress info
-        progress = ProgressInfo(phase=job.progress_phase, percent=job.progress_percent)
-
-        return JobStatusResponse(
-            job_id=job.job_id,
-            status=job.status,
-            progress=progress,
-            metrics=metrics,
-            error_message=job.error_message,
-            links=JobLinks(
-                self=f"/jobs/{job.job_id}",
-                report=(
-                    f"/jobs/{job.job_id}/report" if job.status == "succeeded" else None
-                ),
-            ),
-        )
+        return _job_status_response(job)
 
     except HTTPException:
         raise
@@ -209,11 +331,11 @@ async def get_job_status(job_id: str, db: Session = Depends(get_db)):
 
 
 @app.get("/jobs/{job_id}/report", response_class=PlainTextResponse)
-async def get_job_report(job_id: str, db: Session = Depends(get_db)):
+async def get_job_report(job_id: str, db: AsyncSession = Depends(get_db)):
     """Get job report."""
     try:
-        repo = JobRepository(db)
-        job = repo.get_job(job_id)
+        repo = AsyncJobRepository(db)
+        job = await repo.get_job(job_id)
 
         if not job:
             raise HTTPException(
@@ -252,34 +374,128 @@ async def get_job_report(job_id: str, db: Session = Depends(get_db)):
         )
 
 
-@app.post("/jobs/{job_id}/cancel", response_model=CancelJobResponse)
-async def cancel_job(job_id: str, db: Session = Depends(get_db)):
-    """Cancel a job."""
+def _sse_event(data: str, event: Optional[str] = None) -> str:
+    """Format a server-sent event, one data line per line of text."""
+    lines = [f"event: {event}"] if event else []
+    lines.extend(f"data: {line}" for line in data.split("\n"))
+    return "\n".join(lines) + "\n\n"
+
+
+async def _stored_report(job_id: str) -> Optional[str]:
+    """Read the stored report of a succeeded job, or None if there is none."""
+    async with asynccontextmanager(get_db)() as db:
+        job = await AsyncJobRepository(db).get_job(job_id)
+    if not job or job.status != "succeeded" or not job.report_path:
+        return None
+    try:
+        return read_report_file(job.report_path)
+    except FileNotFoundError:
+        return None
+
+
+async def _live_report_events(job_id: str, queue: asyncio.Queue):
+    """Yield report tokens for a job until its worker closes the stream.
+
+    Only the simple agent path publishes tokens; when a job finishes
+    without relaying any, its stored report is sent before the end event.
+    """
+    relayed = False
+    try:
+        while True:
+            try:
+                chunk = await asyncio.wait_for(
+                    queue.get(), timeout=settings.job_hard_timeout_sec
+                )
+            except asyncio.TimeoutError:
+                logger.warning(f"Report stream for job {job_id} timed out")
+                break
+            if chunk is None:
+                if not relayed:
+                    report_content = await _stored_report(job_id)
+                    if report_content is not None:
+                        yield _sse_event(report_content)
+                break
+            relayed = True
+            yield _sse_event(chunk)
+        yield _sse_event("", event="end")
+    finally:
+        release_report_stream(job_id, queue)
+
+
+@app.get("/jobs/{job_id}/report/stream")
+async def stream_job_report(job_id: str, db: AsyncSession = Depends(get_db)):
+    """Stream the job report as server-sent events while it is generated."""
+    # Subscribe before reading the status so no tokens are missed in between
+    queue = open_report_stream(job_id)
     try:
-        repo = JobRepository(db)
-        job = repo.get_job(job_id)
+        repo = AsyncJobRepository(db)
+        job = await repo.get_job(job_id)
 
         if not job:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND, detail="Job not found"
             )
 
-        if job.status in ["succeeded", "failed", "canceled", "expired"]:
+        if job.status in ["queued", "running"]:
+            return StreamingResponse(
+                _live_report_events(job_id, queue), media_type="text/event-stream"
+            )
+
+        release_report_stream(job_id, queue)
+
+        if job.status != "succeeded" or not job.report_path:
             raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f"Cannot cancel job with status: {job.status}",
+                status_code=status.HTTP_409_CONFLICT,
+                detail=f"Report not available. Job status: {job.status}",
+            )
+
+        try:
+            report_content = read_report_file(job.report_path)
+        except FileNotFoundError:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND, detail="Report file not found"
             )
 
-        canceled_job = repo.cancel_job(job_id)
+        events = [_sse_event(report_content), _sse_event("", event="end")]
+        return StreamingResponse(iter(events), media_type="text/event-stream")
+
+    except HTTPException:
+        release_report_stream(job_id, queue)
+        raise
+    except Exception as e:
+        release_report_stream(job_id, queue)
+        logger.error(f"Error streaming job report: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to stream job report: {str(e)}",
+        )
+
+
+@app.post("/jobs/{job_id}/cancel", response_model=CancelJobResponse)
+async def cancel_job(job_id: str, db: AsyncSession = Depends(get_db)):
+    """Cancel a job."""
+    try:
+        repo = AsyncJobRepository(db)
+        canceled_job = await repo.cancel_job(job_id)
 
+        # Nothing was updated: tell a missing job from a finished one
         if not canceled_job:
+            job = await repo.get_job(job_id)
+            if not job:
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND, detail="Job not found"
+                )
+
             raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail="Failed to cancel job",
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Cannot cancel job with status: {job.status}",
             )
 
         logger.info(f"Job {job_id} cancelled")
 
+        # A job canceled while queued never reaches a worker to end its streams
+        close_report_stream(job_id)
+
         return CancelJobResponse(
             job_id=canceled_job.job_id,
             status=canceled_job.status,
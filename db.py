@@ -1,9 +1,23 @@
 """Database configuration and session management."""
 
-import json
-from typing import Optional
-
-from sqlalchemy import create_engine, text
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import AsyncGenerator, Optional
+
+import orjson
+from sqlalchemy import (
+    create_engine,
+    event,
+    func,
+    insert,
+    lambda_stmt,
+    literal,
+    select,
+    text,
+    update,
+)
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, Session
 from sqlalchemy.pool import StaticPool
 
@@ -12,30 +26,162 @@ from settings import settings
 from utils import get_current_timestamp
 
 
+def _json_serializer(value) -> str:
+    """Encode JSON columns with orjson."""
+    return orjson.dumps(value).decode()
+
+
 # Create synchronous engine for SQLite
 engine = create_engine(
     settings.db_url,
     poolclass=StaticPool,
     connect_args={"check_same_thread": False},
+    json_serializer=_json_serializer,
+    json_deserializer=orjson.loads,
+    insertmanyvalues_page_size=1000,
+    query_cache_size=1200,
+    echo=False,
+)
+
+# WAL lets readers proceed during writes; NORMAL sync is durable in WAL mode
+_SQLITE_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA mmap_size=268435456",
+    "PRAGMA cache_size=-65536",
+)
+
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record) -> None:
+    """Apply performance pragmas to each new SQLite connection."""
+    cursor = dbapi_connection.cursor()
+    for pragma in _SQLITE_PRAGMAS:
+        cursor.execute(pragma)
+    cursor.close()
+
+
+if engine.dialect.name == "sqlite":
+    event.listen(engine, "connect", _set_sqlite_pragmas)
+
+# Statuses a job can no longer leave
+FINISHED_STATUSES = ("succeeded", "failed", "canceled", "expired")
+
+# Columns that update_job_status may set
+_JOB_COLS = frozenset(column.name for column in Job.__table__.columns)
+
+
+def _job_update(job_id: str, status: str, fields: dict):
+    """Build an UPDATE of a job's status and any known column in fields."""
+    values = {key: value for key, value in fields.items() if key in _JOB_COLS}
+    values["status"] = status
+    return update(Job).where(Job.job_id == job_id).values(**values)
+
+
+def _cancel_update(job_id: str):
+    """Build a conditional UPDATE that cancels a job unless it has finished."""
+    stmt = _job_update(job_id, "canceled", {"finished_at": get_current_timestamp()})
+    return stmt.where(Job.status.not_in(FINISHED_STATUSES))
+
+
+# Create session factory; objects stay loaded after commit, so callers can
+# keep using a returned job without re-reading it or holding the session open
+SessionLocal = sessionmaker(
+    autocommit=False, autoflush=False, expire_on_commit=False, bind=engine
+)
+
+
+def to_async_url(db_url: str) -> str:
+    """Map a synchronous database URL onto its async driver."""
+    if db_url.startswith("sqlite:"):
+        return db_url.replace("sqlite:", "sqlite+aiosqlite:", 1)
+    if db_url.startswith("postgresql:"):
+        return db_url.replace("postgresql:", "postgresql+asyncpg:", 1)
+    return db_url
+
+
+# Create async engine for API request handlers
+async_engine = create_async_engine(
+    to_async_url(settings.db_url),
+    json_serializer=_json_serializer,
+    json_deserializer=orjson.loads,
+    insertmanyvalues_page_size=1000,
     echo=False,
 )
 
-# Create session factory
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+if async_engine.dialect.name == "sqlite":
+    event.listen(async_engine.sync_engine, "connect", _set_sqlite_pragmas)
+
+# Create async session factory; objects stay loaded after commit so handlers
+# can read them without triggering lazy loads outside the event loop
+AsyncSessionLocal = async_sessionmaker(
+    async_engine, autoflush=False, expire_on_commit=False
+)
 
 
 def init_db() -> None:
     """Initialize database tables."""
     Base.metadata.create_all(bind=engine)
 
+    # create_all skips existing tables, so add indexes introduced since
+    for index in Job.__table__.indexes:
+        index.create(bind=engine, checkfirst=True)
 
-def get_db() -> Session:
-    """Get database session."""
-    db = SessionLocal()
-    try:
+
+async def get_db() -> AsyncGenerator[AsyncSession, None]:
+    """Get async database session."""
+    async with AsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close()
+
+
+def _expire_update(timeout_seconds: int):
+    """Build an UPDATE expiring running jobs started before the timeout."""
+    cutoff_time = datetime.now(timezone.utc) - timedelta(seconds=timeout_seconds)
+    return (
+        update(Job)
+        .where(Job.status == "running", Job.started_at < cutoff_time)
+        .values(
+            status="expired",
+            finished_at=get_current_timestamp(),
+            error_message="Job expired due to timeout",
+        )
+    )
+
+
+def _claim_update(limit: int, worker_prefix: str):
+    """Build an UPDATE claiming the oldest queued jobs, returning them."""
+    queued = (
+        select(Job.job_id)
+        .where(Job.status == "queued")
+        .order_by(Job.queued_at)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    )
+    return (
+        update(Job)
+        .where(Job.job_id.in_(queued), Job.status == "queued")
+        .values(
+            status="running",
+            started_at=get_current_timestamp(),
+            worker_id=literal(f"{worker_prefix}-") + Job.job_id,
+        )
+        .returning(Job)
+    )
+
+
+def _queued_ids_select(limit: int):
+    return lambda_stmt(
+        lambda: select(Job.job_id)
+        .where(Job.status == "queued")
+        .order_by(Job.queued_at)
+        .limit(limit)
+    )
+
+
+def _count_running_select():
+    return lambda_stmt(
+        lambda: select(func.count()).select_from(Job).where(Job.status == "running")
+    )
 
 
 class JobRepository:
@@ -49,30 +195,44 @@ class JobRepository:
         job = Job(**job_data)
         self.db.add(job)
         self.db.commit()
-        self.db.refresh(job)
         return job
 
-    def get_job(self, job_id: str) -> Optional[Job]:
-        """Get job by ID."""
-        return self.db.query(Job).filter(Job.job_id == job_id).first()
+    def create_jobs(self, rows: list[dict]) -> list[str]:
+        """Create several jobs with one multi-row INSERT."""
+        if rows:
+            self.db.execute(insert(Job), rows)
+            self.db.commit()
+        return [row["job_id"] for row in rows]
+
+    def get_job(self, job_id: str, refresh: bool = False) -> Optional[Job]:
+        """Get job by ID.
+
+        Jobs already loaded in this session come from the identity map without
+        a query; pass refresh=True to re-read changes made by other sessions.
+        """
+        return self.db.get(Job, job_id, populate_existing=refresh)
 
     def get_job_by_idempotency_key(self, idempotency_key: str) -> Optional[Job]:
         """Get job by idempotency key."""
-        return self.db.query(Job).filter(Job.idempotency_key == idempotency_key).first()
+        stmt = lambda_stmt(
+            lambda: select(Job).where(Job.idempotency_key == idempotency_key)
+        )
+        return self.db.execute(stmt).scalars().first()
 
     def update_job_status(self, job_id: str, status: str, **kwargs) -> Optional[Job]:
         """Update job status and other fields."""
-        job = self.get_job(job_id)
-        if not job:
-            return None
+        return self._execute_update(job_id, _job_update(job_id, status, kwargs))
 
-        job.status = status
-        for key, value in kwargs.items():
-            if hasattr(job, key):
-                setattr(job, key, value)
+    def _execute_update(self, job_id: str, stmt) -> Optional[Job]:
+        """Run a job UPDATE and return the updated job, or None if no row matched."""
+        # Return the updated row from the UPDATE itself where RETURNING is available
+        if not self.db.get_bind().dialect.update_returning:
+            result = self.db.execute(stmt)
+            self.db.commit()
+            return self.get_job(job_id) if result.rowcount else None
 
+        job = self.db.execute(stmt.returning(Job)).scalar_one_or_none()
         self.db.commit()
-        self.db.refresh(job)
         return job
 
     def update_job_progress(
@@ -85,9 +245,7 @@ class JobRepository:
 
     def update_job_metrics(self, job_id: str, metrics: dict) -> Optional[Job]:
         """Update job metrics."""
-        return self.update_job_status(
-            job_id, "running", metrics_json=json.dumps(metrics)
-        )
+        return self.update_job_status(job_id, "running", metrics_json=metrics)
 
     def set_job_worker(self, job_id: str, worker_id: str) -> Optional[Job]:
         """Set worker ID for job."""
@@ -95,17 +253,50 @@ class JobRepository:
 
     def get_queued_jobs(self, limit: int = 10) -> list[Job]:
         """Get queued jobs for processing."""
-        return (
-            self.db.query(Job)
-            .filter(Job.status == "queued")
+        stmt = lambda_stmt(
+            lambda: select(Job)
+            .where(Job.status == "queued")
             .order_by(Job.queued_at)
             .limit(limit)
-            .all()
         )
+        return list(self.db.execute(stmt).scalars())
+
+    def get_queued_job_ids(self, limit: int = 10) -> list[str]:
+        """Get IDs of the oldest queued jobs without loading full jobs."""
+        return list(self.db.execute(_queued_ids_select(limit)).scalars())
+
+    def claim_queued_jobs(self, limit: int, worker_prefix: str) -> list[Job]:
+        """Atomically mark the oldest queued jobs as running and return them.
+
+        Each claimed job gets worker ID "<worker_prefix>-<job_id>". Postgres skips
+        rows locked by a concurrent claim; SQLite serializes the UPDATE itself.
+        """
+        if not self.db.get_bind().dialect.update_returning:
+            return [
+                job
+                for job_id in self.get_queued_job_ids(limit)
+                if (
+                    job := self.update_job_status(
+                        job_id,
+                        "running",
+                        started_at=get_current_timestamp(),
+                        worker_id=f"{worker_prefix}-{job_id}",
+                    )
+                )
+            ]
+
+        jobs = list(self.db.execute(_claim_update(limit, worker_prefix)).scalars())
+        self.db.commit()
+        return jobs
 
     def get_running_jobs(self) -> list[Job]:
         """Get all running jobs."""
-        return self.db.query(Job).filter(Job.status == "running").all()
+        stmt = lambda_stmt(lambda: select(Job).where(Job.status == "running"))
+        return list(self.db.execute(stmt).scalars())
+
+    def count_running_jobs(self) -> int:
+        """Count running jobs."""
+        return self.db.execute(_count_running_select()).scalar_one()
 
     def mark_job_finished(
         self,
@@ -124,48 +315,143 @@ class JobRepository:
         )
 
     def cancel_job(self, job_id: str) -> Optional[Job]:
-        """Cancel a job."""
-        job = self.get_job(job_id)
-        if not job or job.status in ["succeeded", "failed", "canceled", "expired"]:
-            return None
-
-        return self.update_job_status(
-            job_id, "canceled", finished_at=get_current_timestamp()
-        )
+        """Cancel a job; returns None if it is missing or already finished."""
+        return self._execute_update(job_id, _cancel_update(job_id))
 
     def expire_stale_jobs(self, timeout_seconds: int) -> int:
         """Expire stale running jobs."""
-        from datetime import datetime, timezone, timedelta
+        # Expire stale running jobs in a single UPDATE
+        result = self.db.execute(_expire_update(timeout_seconds))
+        self.db.commit()
+
+        return result.rowcount
 
-        cutoff_time = datetime.now(timezone.utc) - timedelta(seconds=timeout_seconds)
-        cutoff_str = cutoff_time.isoformat()
 
-        # Find stale running jobs
-        stale_jobs = (
-            self.db.query(Job)
-            .filter(Job.status == "running", Job.started_at < cutoff_str)
-            .all()
+class AsyncJobRepository:
+    """Async repository for job operations used by API handlers and the scheduler."""
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def create_job(self, job_data: dict) -> Job:
+        """Create a new job."""
+        job = Job(**job_data)
+        self.db.add(job)
+        await self.db.commit()
+        return job
+
+    async def create_jobs(self, rows: list[dict]) -> list[str]:
+        """Create several jobs with one multi-row INSERT."""
+        if rows:
+            await self.db.execute(insert(Job), rows)
+            await self.db.commit()
+        return [row["job_id"] for row in rows]
+
+    async def get_job(self, job_id: str) -> Optional[Job]:
+        """Get job by ID."""
+        return await self.db.get(Job, job_id)
+
+    async def get_jobs(self, job_ids: list[str]) -> dict[str, Job]:
+        """Get the existing jobs among job_ids, keyed by ID."""
+        if not job_ids:
+            return {}
+        result = await self.db.execute(select(Job).where(Job.job_id.in_(job_ids)))
+        return {job.job_id: job for job in result.scalars()}
+
+    async def get_job_by_idempotency_key(self, idempotency_key: str) -> Optional[Job]:
+        """Get job by idempotency key."""
+        stmt = lambda_stmt(
+            lambda: select(Job).where(Job.idempotency_key == idempotency_key)
         )
+        result = await self.db.execute(stmt)
+        return result.scalars().first()
+
+    async def update_job_status(
+        self, job_id: str, status: str, **kwargs
+    ) -> Optional[Job]:
+        """Update job status and other fields."""
+        return await self._execute_update(job_id, _job_update(job_id, status, kwargs))
+
+    async def _execute_update(self, job_id: str, stmt) -> Optional[Job]:
+        """Run a job UPDATE and return the updated job, or None if no row matched."""
+        # Return the updated row from the UPDATE itself where RETURNING is available
+        if not self.db.get_bind().dialect.update_returning:
+            result = await self.db.execute(stmt)
+            await self.db.commit()
+            return await self.get_job(job_id) if result.rowcount else None
+
+        result = await self.db.execute(stmt.returning(Job))
+        job = result.scalar_one_or_none()
+        await self.db.commit()
+        return job
 
-        count = 0
-        for job in stale_jobs:
-            job.status = "expired"
-            job.finished_at = get_current_timestamp()
-            job.error_message = "Job expired due to timeout"
-            count += 1
+    async def cancel_job(self, job_id: str) -> Optional[Job]:
+        """Cancel a job; returns None if it is missing or already finished."""
+        return await self._execute_update(job_id, _cancel_update(job_id))
+
+    async def get_queued_job_ids(self, limit: int = 10) -> list[str]:
+        """Get IDs of the oldest queued jobs without loading full jobs."""
+        result = await self.db.execute(_queued_ids_select(limit))
+        return list(result.scalars())
+
+    async def count_running_jobs(self) -> int:
+        """Count running jobs."""
+        result = await self.db.execute(_count_running_select())
+        return result.scalar_one()
+
+    async def claim_queued_jobs(self, limit: int, worker_prefix: str) -> list[Job]:
+        """Atomically mark the oldest queued jobs as running and return them."""
+        if not self.db.get_bind().dialect.update_returning:
+            jobs = []
+            for job_id in await self.get_queued_job_ids(limit):
+                job = await self.update_job_status(
+                    job_id,
+                    "running",
+                    started_at=get_current_timestamp(),
+                    worker_id=f"{worker_prefix}-{job_id}",
+                )
+                if job:
+                    jobs.append(job)
+            return jobs
+
+        result = await self.db.execute(_claim_update(limit, worker_prefix))
+        jobs = list(result.scalars())
+        await self.db.commit()
+        return jobs
+
+    async def expire_stale_jobs(self, timeout_seconds: int) -> int:
+        """Expire stale running jobs."""
+        result = await self.db.execute(_expire_update(timeout_seconds))
+        await self.db.commit()
+        return result.rowcount
 
-        if count > 0:
-            self.db.commit()
 
-        return count
+# Health probes are polled often; reuse a result for this many seconds
+_HEALTH_TTL_SEC = 1.0
+_health_lock = threading.Lock()
+_health_checked_at = float("-inf")
+_health_ok = False
 
 
 def check_db_health() -> bool:
-    """Check database health."""
-    try:
-        with engine.connect() as conn:
-            conn.execute(text("SELECT 1"))
-            conn.close()
-        return True
-    except Exception:
-        return False
+    """Check database health, caching the result for a short TTL."""
+    global _health_checked_at, _health_ok
+
+    if time.monotonic() - _health_checked_at < _HEALTH_TTL_SEC:
+        return _health_ok
+
+    with _health_lock:
+        # Another caller may have probed while we waited for the lock
+        now = time.monotonic()
+        if now - _health_checked_at < _HEALTH_TTL_SEC:
+            return _health_ok
+
+        try:
+            with engine.connect() as conn:
+                conn.execute(text("SELECT 1"))
+            _health_ok = True
+        except Exception:
+            _health_ok = False
+        _health_checked_at = now
+
+    return _health_ok
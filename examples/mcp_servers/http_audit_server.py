@@ -5,13 +5,27 @@ This server provides basic audit tools via HTTP endpoints.
 """
 
 import asyncio
-import json
-from typing import Dict, List, Any, Optional
-from fastapi import FastAPI, HTTPException
+import hashlib
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import orjson
+from fastapi import FastAPI, HTTPException, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 import uvicorn
 
-app = FastAPI(title="HTTP MCP Audit Server", version="1.0.0")
+
+class ORJSONResponse(JSONResponse):
+    """JSON response rendered with orjson."""
+    
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content)
+
+
+app = FastAPI(
+    title="HTTP MCP Audit Server",
+    version="1.0.0",
+    default_response_class=ORJSONResponse
+)
 
 # Add CORS middleware
 app.add_middleware(
@@ -93,170 +107,188 @@ RESOURCES = [
     }
 ]
 
-@app.get("/health")
+# Static resource contents, keyed by uri
+RESOURCE_DATA = {
+    "vulnerability-db": {
+        "vulnerabilities": [
+            {
+                "id": "reentrancy",
+                "name": "Reentrancy Attack",
+                "severity": "high",
+                "description": "External calls before state changes can lead to reentrancy attacks"
+            },
+            {
+                "id": "integer-overflow",
+                "name": "Integer Overflow/Underflow",
+                "severity": "medium",
+                "description": "Arithmetic operations without proper bounds checking"
+            }
+        ]
+    },
+    "gas-patterns": {
+        "patterns": [
+            {
+                "name": "storage_optimization",
+                "description": "Pack structs to reduce storage slots",
+                "example": "struct Packed { uint128 a; uint128 b; }"
+            },
+            {
+                "name": "loop_optimization",
+                "description": "Avoid loops with external calls",
+                "example": "Use batch operations instead of loops"
+            }
+        ]
+    }
+}
+
+def _dumps(obj: Any) -> str:
+    """Serialize tool output as indented JSON text."""
+    return orjson.dumps(obj, option=orjson.OPT_INDENT_2).decode()
+
+def _static_payload(data: Any) -> Tuple[bytes, str]:
+    """Encode a static response once and derive its ETag."""
+    body = orjson.dumps(data)
+    etag = '"' + hashlib.blake2b(body, digest_size=8).hexdigest() + '"'
+    return body, etag
+
+# Static responses are encoded once at import
+_TOOLS_PAYLOAD = _static_payload({"tools": TOOLS})
+_RESOURCES_PAYLOAD = _static_payload({"resources": RESOURCES})
+_RESOURCE_PAYLOADS = {
+    uri: _static_payload({
+        "contents": [
+            {
+                "type": "text",
+                "text": _dumps(data)
+            }
+        ],
+        "mimeType": "application/json"
+    })
+    for uri, data in RESOURCE_DATA.items()
+}
+
+def _static_response(request: Request, payload: Tuple[bytes, str]) -> Response:
+    """Serve precomputed JSON, or 304 when the client already has it."""
+    body, etag = payload
+    headers = {"ETag": etag, "Cache-Control": "public, max-age=60"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    return Response(body, media_type="application/json", headers=headers)
+
+@app.get("/health", response_model=None)
 async def health_check():
     """Health check endpoint."""
     return {"status": "healthy", "service": "HTTP MCP Audit Server"}
 
-@app.get("/tools")
-async def list_tools():
+@app.get("/tools", response_model=None)
+async def list_tools(request: Request):
     """List available tools."""
-    return {"tools": TOOLS}
+    return _static_response(request, _TOOLS_PAYLOAD)
 
-@app.get("/resources")
-async def list_resources():
+@app.get("/resources", response_model=None)
+async def list_resources(request: Request):
     """List available resources."""
-    return {"resources": RESOURCES}
+    return _static_response(request, _RESOURCES_PAYLOAD)
 
-@app.post("/tools/call")
-async def call_tool(request: Dict[str, Any]):
-    """Call a tool."""
-    tool_name = request.get("name")
-    arguments = request.get("arguments", {})
-    
-    if tool_name == "analyze_contract":
-        contract_code = arguments.get("contract_code", "")
-        contract_type = arguments.get("contract_type", "general")
-        
-        # Mock analysis
-        analysis_result = {
-            "vulnerabilities": [
-                {
-                    "severity": "medium",
-                    "type": "reentrancy",
-                    "description": "Potential reentrancy vulnerability detected",
-                    "line": 15,
-                    "recommendation": "Use checks-effects-interactions pattern"
-                }
-            ],
-            "gas_optimizations": [
-                {
-                    "type": "storage_optimization",
-                    "description": "Consider using packed structs",
-                    "line": 8
-                }
-            ],
-            "summary": f"Analysis of {contract_type} contract completed. Found 1 vulnerability and 1 optimization opportunity."
-        }
-        
-        return {
-            "content": [
-                {
-                    "type": "text",
-                    "text": json.dumps(analysis_result, indent=2)
-                }
-            ],
-            "isError": False
-        }
+def _analyze_contract(arguments: Dict[str, Any]) -> Dict[str, Any]:
+    """Mock contract analysis."""
+    contract_type = arguments.get("contract_type", "general")
     
-    elif tool_name == "check_vulnerability_db":
-        pattern = arguments.get("pattern", "")
-        
-        # Mock vulnerability check
-        vulnerabilities = [
+    return {
+        "vulnerabilities": [
             {
-                "id": "CVE-2023-1234",
-                "title": f"Vulnerability related to {pattern}",
-                "severity": "high",
-                "description": f"Known vulnerability pattern: {pattern}",
-                "references": ["https://example.com/vuln1"]
+                "severity": "medium",
+                "type": "reentrancy",
+                "description": "Potential reentrancy vulnerability detected",
+                "line": 15,
+                "recommendation": "Use checks-effects-interactions pattern"
             }
-        ]
-        
-        return {
-            "content": [
-                {
-                    "type": "text",
-                    "text": json.dumps(vulnerabilities, indent=2)
-                }
-            ],
-            "isError": False
-        }
+        ],
+        "gas_optimizations": [
+            {
+                "type": "storage_optimization",
+                "description": "Consider using packed structs",
+                "line": 8
+            }
+        ],
+        "summary": f"Analysis of {contract_type} contract completed. Found 1 vulnerability and 1 optimization opportunity."
+    }
+
+def _check_vulnerability_db(arguments: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Mock vulnerability database lookup."""
+    pattern = arguments.get("pattern", "")
     
-    elif tool_name == "get_gas_estimation":
-        contract_code = arguments.get("contract_code", "")
-        function_name = arguments.get("function_name")
-        
-        # Mock gas estimation
-        gas_estimate = {
-            "total_gas": 21000,
-            "function_estimates": {
-                "deploy": 150000,
-                "transfer": 21000,
-                "approve": 46000
-            },
-            "optimization_suggestions": [
-                "Consider using assembly for gas-critical operations",
-                "Use events instead of storage for non-critical data"
-            ]
+    return [
+        {
+            "id": "CVE-2023-1234",
+            "title": f"Vulnerability related to {pattern}",
+            "severity": "high",
+            "description": f"Known vulnerability pattern: {pattern}",
+            "references": ["https://example.com/vuln1"]
         }
-        
-        if function_name:
-            gas_estimate["specific_function"] = {
-                "name": function_name,
-                "estimated_gas": gas_estimate["function_estimates"].get(function_name, 21000)
-            }
-        
-        return {
-            "content": [
-                {
-                    "type": "text",
-                    "text": json.dumps(gas_estimate, indent=2)
-                }
-            ],
-            "isError": False
+    ]
+
+def _get_gas_estimation(arguments: Dict[str, Any]) -> Dict[str, Any]:
+    """Mock gas estimation."""
+    function_name = arguments.get("function_name")
+    
+    gas_estimate = {
+        "total_gas": 21000,
+        "function_estimates": {
+            "deploy": 150000,
+            "transfer": 21000,
+            "approve": 46000
+        },
+        "optimization_suggestions": [
+            "Consider using assembly for gas-critical operations",
+            "Use events instead of storage for non-critical data"
+        ]
+    }
+    
+    if function_name:
+        gas_estimate["specific_function"] = {
+            "name": function_name,
+            "estimated_gas": gas_estimate["function_estimates"].get(function_name, 21000)
         }
     
-    else:
-        raise HTTPException(status_code=404, detail=f"Tool '{tool_name}' not found")
+    return gas_estimate
 
-@app.get("/resources/{uri}")
-async def read_resource(uri: str):
-    """Read a resource."""
-    if uri == "vulnerability-db":
-        data = {
-            "vulnerabilities": [
-                {
-                    "id": "reentrancy",
-                    "name": "Reentrancy Attack",
-                    "severity": "high",
-                    "description": "External calls before state changes can lead to reentrancy attacks"
-                },
-                {
-                    "id": "integer-overflow",
-                    "name": "Integer Overflow/Underflow",
-                    "severity": "medium",
-                    "description": "Arithmetic operations without proper bounds checking"
-                }
-            ]
-        }
-    elif uri == "gas-patterns":
-        data = {
-            "patterns": [
-                {
-                    "name": "storage_optimization",
-                    "description": "Pack structs to reduce storage slots",
-                    "example": "struct Packed { uint128 a; uint128 b; }"
-                },
-                {
-                    "name": "loop_optimization",
-                    "description": "Avoid loops with external calls",
-                    "example": "Use batch operations instead of loops"
-                }
-            ]
-        }
-    else:
-        raise HTTPException(status_code=404, detail=f"Resource '{uri}' not found")
+# Tool handlers, keyed by tool name
+HANDLERS: Dict[str, Callable[[Dict[str, Any]], Any]] = {
+    "analyze_contract": _analyze_contract,
+    "check_vulnerability_db": _check_vulnerability_db,
+    "get_gas_estimation": _get_gas_estimation,
+}
+
+@app.post("/tools/call", response_model=None)
+async def call_tool(request: Dict[str, Any]):
+    """Call a tool."""
+    tool_name = request.get("name")
+    arguments = request.get("arguments", {})
     
-    return {
-        "contents": [
+    handler = HANDLERS.get(tool_name)
+    if handler is None:
+        raise HTTPException(status_code=404, detail=f"Tool '{tool_name}' not found")
+    
+    # Returning the response directly skips jsonable_encoder
+    return ORJSONResponse({
+        "content": [
             {
                 "type": "text",
-                "text": json.dumps(data, indent=2)
+                "text": _dumps(handler(arguments))
             }
         ],
-        "mimeType": "application/json"
-    }
+        "isError": False
+    })
+
+@app.get("/resources/{uri}", response_model=None)
+async def read_resource(uri: str, request: Request):
+    """Read a resource."""
+    payload = _RESOURCE_PAYLOADS.get(uri)
+    if payload is None:
+        raise HTTPException(status_code=404, detail=f"Resource '{uri}' not found")
+    
+    return _static_response(request, payload)
 
 if __name__ == "__main__":
     print("Starting HTTP MCP Audit Server on http://localhost:8001")
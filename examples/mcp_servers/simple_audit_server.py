@@ -5,10 +5,11 @@ This is an example of how to create an MCP server that provides audit tools.
 """
 
 import asyncio
-import json
+import re
 import sys
 from typing import Any, Dict, List
 
+import orjson
 from mcp.server import Server
 from mcp.server.stdio import stdio_server
 from mcp.types import (
@@ -21,11 +22,103 @@ from mcp.types import (
 )
 
 
+def _dumps(obj: Any) -> str:
+    """Serialize tool output as indented JSON text."""
+    return orjson.dumps(obj, option=orjson.OPT_INDENT_2).decode()
+
+
+# Patterns for the line scans, compiled once so each check is a single pass
+_EXTERNAL_CALL_RE = re.compile(r"\.(?:call|send|transfer)\(", re.IGNORECASE)
+_PUBLIC_FUNCTION_RE = re.compile(
+    r"^(?=.*(?:public|external)).*?function((?:(?!function)[^(\n])*)",
+    re.IGNORECASE | re.MULTILINE
+)
+_ACCESS_MODIFIER_RE = re.compile(r"only(?:owner|admin|role)", re.IGNORECASE)
+
+
+# Lowercased ERC20 declarations, each paired with the issue reported when it is missing
+_ERC20_REQUIREMENTS = tuple(
+    (f"function {func.lower()}", {
+        "severity": "high",
+        "description": f"Missing required ERC20 function: {func}",
+        "recommendation": f"Implement the {func} function according to ERC20 standard"
+    })
+    for func in ('totalSupply', 'balanceOf', 'transfer', 'transferFrom', 'approve', 'allowance')
+) + tuple(
+    (f"event {event.lower()}", {
+        "severity": "high",
+        "description": f"Missing required ERC20 event: {event}",
+        "recommendation": f"Declare the {event} event according to ERC20 standard"
+    })
+    for event in ('Transfer', 'Approval')
+)
+
+
+# Reference information for get_vulnerability_info
+VULNERABILITY_INFO = {
+    "reentrancy": {
+        "description": "Reentrancy attacks occur when external calls allow attackers to re-enter the contract and manipulate state",
+        "common_patterns": [
+            "External calls before state changes",
+            "Using .call() or .send() without proper checks",
+            "Not following checks-effects-interactions pattern"
+        ],
+        "prevention": [
+            "Use checks-effects-interactions pattern",
+            "Use reentrancy guards",
+            "Avoid external calls in state-changing functions"
+        ],
+        "severity": "high"
+    },
+    "access_control": {
+        "description": "Access control issues occur when functions lack proper authorization checks",
+        "common_patterns": [
+            "Public functions without modifiers",
+            "Missing onlyOwner or similar modifiers",
+            "Incorrect role-based access control"
+        ],
+        "prevention": [
+            "Use appropriate access control modifiers",
+            "Implement role-based access control",
+            "Validate caller permissions"
+        ],
+        "severity": "medium"
+    },
+    "erc20_compliance": {
+        "description": "ERC20 compliance issues occur when contracts don't properly implement the ERC20 standard",
+        "common_patterns": [
+            "Missing required functions",
+            "Incorrect function signatures",
+            "Missing required events"
+        ],
+        "prevention": [
+            "Follow ERC20 standard specification",
+            "Implement all required functions",
+            "Emit required events"
+        ],
+        "severity": "high"
+    }
+}
+
+
+# Tool output for each known vulnerability type, encoded once
+VULNERABILITY_INFO_TEXT = {
+    vuln_type: _dumps(info)
+    for vuln_type, info in VULNERABILITY_INFO.items()
+}
+
+
 class SimpleAuditServer:
     """Simple MCP server providing basic audit tools."""
     
     def __init__(self):
         self.server = Server("simple-audit-server")
+        self._handlers = {
+            "check_reentrancy": self._check_reentrancy,
+            "check_access_control": self._check_access_control,
+            "check_erc20_compliance": self._check_erc20_compliance,
+            "get_vulnerability_info": self._get_vulnerability_info,
+        }
         self._setup_handlers()
     
     def _setup_handlers(self):
@@ -97,15 +190,8 @@ class SimpleAuditServer:
         async def call_tool(name: str, arguments: Dict[str, Any]) -> CallToolResult:
             """Handle tool calls."""
             try:
-                if name == "check_reentrancy":
-                    return await self._check_reentrancy(arguments)
-                elif name == "check_access_control":
-                    return await self._check_access_control(arguments)
-                elif name == "check_erc20_compliance":
-                    return await self._check_erc20_compliance(arguments)
-                elif name == "get_vulnerability_info":
-                    return await self._get_vulnerability_info(arguments)
-                else:
+                handler = self._handlers.get(name)
+                if handler is None:
                     return CallToolResult(
                         content=[TextContent(
                             type="text",
@@ -113,6 +199,7 @@ class SimpleAuditServer:
                         )],
                         isError=True
                     )
+                return await handler(arguments)
             except Exception as e:
                 return CallToolResult(
                     content=[TextContent(
@@ -129,24 +216,32 @@ class SimpleAuditServer:
         # Simple reentrancy detection
         issues = []
         
-        # Check for external calls before state changes
-        lines = code.split('\n')
-        for i, line in enumerate(lines):
-            line_lower = line.lower().strip()
+        # Check for external calls followed by a state change in the next lines
+        line_no, pos, last_line = 1, 0, 0
+        for match in _EXTERNAL_CALL_RE.finditer(code):
+            line_no += code.count('\n', pos, match.start())
+            pos = match.start()
+            if line_no == last_line:
+                continue
+            last_line = line_no
+            
+            # Window covering the following 9 lines
+            start = end = code.find('\n', match.end())
+            if start == -1:
+                continue
+            for _ in range(9):
+                end = code.find('\n', end + 1)
+                if end == -1:
+                    end = len(code)
+                    break
             
-            # Look for external calls
-            if any(call in line_lower for call in ['.call(', '.send(', '.transfer(']):
-                # Check if state is modified after this line
-                for j in range(i + 1, min(i + 10, len(lines))):
-                    next_line = lines[j].lower().strip()
-                    if any(op in next_line for op in ['=', '+=', '-=', '*=', '/=']):
-                        issues.append({
-                            "line": i + 1,
-                            "severity": "high",
-                            "description": "Potential reentrancy vulnerability: external call before state change",
-                            "recommendation": "Use checks-effects-interactions pattern"
-                        })
-                        break
+            if code.find('=', start, end) != -1:
+                issues.append({
+                    "line": line_no,
+                    "severity": "high",
+                    "description": "Potential reentrancy vulnerability: external call before state change",
+                    "recommendation": "Use checks-effects-interactions pattern"
+                })
         
         result = {
             "vulnerability_type": "reentrancy",
@@ -158,7 +253,7 @@ class SimpleAuditServer:
         return CallToolResult(
             content=[TextContent(
                 type="text",
-                text=json.dumps(result, indent=2)
+                text=_dumps(result)
             )]
         )
     
@@ -168,30 +263,28 @@ class SimpleAuditServer:
         
         issues = []
         
-        # Check for functions without access control
-        lines = code.split('\n')
-        for i, line in enumerate(lines):
-            line_lower = line.lower().strip()
+        # Check for public/external functions without access control
+        line_no, pos = 1, 0
+        for match in _PUBLIC_FUNCTION_RE.finditer(code):
+            line_no += code.count('\n', pos, match.start())
+            pos = match.start()
+            
+            # Look for a modifier in the preceding 5 lines
+            start = pos
+            for _ in range(5):
+                if start == 0:
+                    break
+                start = code.rfind('\n', 0, start - 1) + 1
+            if _ACCESS_MODIFIER_RE.search(code, start, pos):
+                continue
             
-            # Look for public/external functions
-            if 'function' in line_lower and ('public' in line_lower or 'external' in line_lower):
-                # Check if function has access control
-                has_access_control = False
-                for j in range(max(0, i - 5), i):
-                    prev_line = lines[j].lower().strip()
-                    if any(mod in prev_line for mod in ['onlyowner', 'onlyadmin', 'onlyrole']):
-                        has_access_control = True
-                        break
-                
-                if not has_access_control:
-                    # Extract function name
-                    func_name = line.split('function')[1].split('(')[0].strip()
-                    issues.append({
-                        "line": i + 1,
-                        "severity": "medium",
-                        "description": f"Function '{func_name}' lacks access control",
-                        "recommendation": "Add appropriate access control modifier"
-                    })
+            func_name = match.group(1).strip()
+            issues.append({
+                "line": line_no,
+                "severity": "medium",
+                "description": f"Function '{func_name}' lacks access control",
+                "recommendation": "Add appropriate access control modifier"
+            })
         
         result = {
             "vulnerability_type": "access_control",
@@ -203,7 +296,7 @@ class SimpleAuditServer:
         return CallToolResult(
             content=[TextContent(
                 type="text",
-                text=json.dumps(result, indent=2)
+                text=_dumps(result)
             )]
         )
     
@@ -211,39 +304,8 @@ class SimpleAuditServer:
         """Check ERC20 standard compliance."""
         code = arguments.get("code", "")
         
-        # Required ERC20 functions
-        required_functions = [
-            'totalSupply',
-            'balanceOf',
-            'transfer',
-            'transferFrom',
-            'approve',
-            'allowance'
-        ]
-        
-        # Required events
-        required_events = ['Transfer', 'Approval']
-        
-        issues = []
         code_lower = code.lower()
-        
-        # Check for required functions
-        for func in required_functions:
-            if f'function {func.lower()}' not in code_lower:
-                issues.append({
-                    "severity": "high",
-                    "description": f"Missing required ERC20 function: {func}",
-                    "recommendation": f"Implement the {func} function according to ERC20 standard"
-                })
-        
-        # Check for required events
-        for event in required_events:
-            if f'event {event.lower()}' not in code_lower:
-                issues.append({
-                    "severity": "high",
-                    "description": f"Missing required ERC20 event: {event}",
-                    "recommendation": f"Declare the {event} event according to ERC20 standard"
-                })
+        issues = [issue for sig, issue in _ERC20_REQUIREMENTS if sig not in code_lower]
         
         result = {
             "vulnerability_type": "erc20_compliance",
@@ -255,7 +317,7 @@ class SimpleAuditServer:
         return CallToolResult(
             content=[TextContent(
                 type="text",
-                text=json.dumps(result, indent=2)
+                text=_dumps(result)
             )]
         )
     
@@ -263,62 +325,19 @@ class SimpleAuditServer:
         """Get information about a specific vulnerability type."""
         vuln_type = arguments.get("vulnerability_type", "").lower()
         
-        vulnerability_info = {
-            "reentrancy": {
-                "description": "Reentrancy attacks occur when external calls allow attackers to re-enter the contract and manipulate state",
-                "common_patterns": [
-                    "External calls before state changes",
-                    "Using .call() or .send() without proper checks",
-                    "Not following checks-effects-interactions pattern"
-                ],
-                "prevention": [
-                    "Use checks-effects-interactions pattern",
-                    "Use reentrancy guards",
-                    "Avoid external calls in state-changing functions"
-                ],
-                "severity": "high"
-            },
-            "access_control": {
-                "description": "Access control issues occur when functions lack proper authorization checks",
-                "common_patterns": [
-                    "Public functions without modifiers",
-                    "Missing onlyOwner or similar modifiers",
-                    "Incorrect role-based access control"
-                ],
-                "prevention": [
-                    "Use appropriate access control modifiers",
-                    "Implement role-based access control",
-                    "Validate caller permissions"
-                ],
-                "severity": "medium"
-            },
-            "erc20_compliance": {
-                "description": "ERC20 compliance issues occur when contracts don't properly implement the ERC20 standard",
-                "common_patterns": [
-                    "Missing required functions",
-                    "Incorrect function signatures",
-                    "Missing required events"
-                ],
-                "prevention": [
-                    "Follow ERC20 standard specification",
-                    "Implement all required functions",
-                    "Emit required events"
-                ],
-                "severity": "high"
-            }
-        }
-        
-        info = vulnerability_info.get(vuln_type, {
-            "description": f"No information available for vulnerability type: {vuln_type}",
-            "common_patterns": [],
-            "prevention": [],
-            "severity": "unknown"
-        })
+        text = VULNERABILITY_INFO_TEXT.get(vuln_type)
+        if text is None:
+            text = _dumps({
+                "description": f"No information available for vulnerability type: {vuln_type}",
+                "common_patterns": [],
+                "prevention": [],
+                "severity": "unknown"
+            })
         
         return CallToolResult(
             content=[TextContent(
                 type="text",
-                text=json.dumps(info, indent=2)
+                text=text
             )]
         )
     
@@ -4,9 +4,17 @@ Python client example for Audit Agent API.
 This script demonstrates how to use the audit agent from Python.
 """
 
-import requests
 import time
-from typing import Dict, Any
+from typing import Any, Dict, List, Tuple
+
+import httpx
+import orjson
+
+
+TERMINAL_STATUSES = ("succeeded", "failed", "canceled", "expired")
+
+# Largest number of job IDs the server accepts per status lookup
+STATUS_BATCH_SIZE = 200
 
 
 class AuditAgentClient:
@@ -14,14 +22,24 @@ class AuditAgentClient:
 
     def __init__(self, base_url: str = "http://localhost:8081"):
         self.base_url = base_url
-        self.session = requests.Session()
-        self.session.headers.update({"Content-Type": "application/json"})
+        # One pooled HTTP/2 connection multiplexes concurrent status polls
+        self.client = httpx.Client(
+            base_url=base_url,
+            http2=True,
+            timeout=60,
+            limits=httpx.Limits(
+                max_connections=200, max_keepalive_connections=50, keepalive_expiry=30
+            ),
+            headers={"Content-Type": "application/json"},
+        )
+        # job_id -> (monotonic time the response arrived, status response)
+        self._status_cache: Dict[str, Tuple[float, Dict[str, Any]]] = {}
 
     def health_check(self) -> Dict[str, Any]:
         """Check service health."""
-        response = self.session.get(f"{self.base_url}/healthz")
+        response = self.client.get("/healthz")
         response.raise_for_status()
-        return response.json()
+        return orjson.loads(response.content)
 
     def create_job(
         self, source_code: str, audit_profile: str = "erc20_basic_v1", **kwargs
@@ -32,24 +50,77 @@ class AuditAgentClient:
             "audit_profile": audit_profile,
             **kwargs,
         }
-        response = self.session.post(f"{self.base_url}/jobs", json=payload)
+        response = self.client.post("/jobs", content=orjson.dumps(payload))
         response.raise_for_status()
-        return response.json()
+        return orjson.loads(response.content)
 
-    def get_job_status(self, job_id: str) -> Dict[str, Any]:
-        """Get job status."""
-        response = self.session.get(f"{self.base_url}/jobs/{job_id}")
-        response.raise_for_status()
-        return response.json()
+    def get_job_status(
+        self, job_id: str, ttl_ms: int = 0, stale_on_error: bool = True
+    ) -> Dict[str, Any]:
+        """Get job status.
+
+        With ttl_ms > 0, a status fetched less than ttl_ms ago is returned
+        without another request, which absorbs tight polling loops.
+
+        With stale_on_error, a server error or dropped connection returns the
+        last known status marked "stale": True instead of raising, so polling
+        rides out a restart of the service.
+        """
+        cached = self._status_cache.get(job_id)
+        if ttl_ms > 0 and cached and (time.monotonic() - cached[0]) * 1000 < ttl_ms:
+            return cached[1]
+
+        try:
+            response = self.client.get(f"/jobs/{job_id}")
+            response.raise_for_status()
+        except (httpx.HTTPStatusError, httpx.TransportError) as e:
+            server_side = (
+                not isinstance(e, httpx.HTTPStatusError)
+                or e.response.is_server_error
+            )
+            if stale_on_error and cached and server_side:
+                print(f"\nStatus request failed, using last known status of {job_id}")
+                return {**cached[1], "stale": True}
+            raise
+        status = orjson.loads(response.content)
+
+        if status["status"] in TERMINAL_STATUSES:
+            self._status_cache.pop(job_id, None)
+        else:
+            # Stamp after the response so its age excludes the request time
+            self._status_cache[job_id] = (time.monotonic(), status)
+        return status
+
+    def get_jobs_status(self, job_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Get the status of several jobs, keyed by job ID; unknown IDs are left out."""
+        statuses = {}
+        for start in range(0, len(job_ids), STATUS_BATCH_SIZE):
+            chunk = job_ids[start : start + STATUS_BATCH_SIZE]
+            response = self.client.post(
+                "/jobs/status_many", content=orjson.dumps({"job_ids": chunk})
+            )
+            response.raise_for_status()
+            statuses.update(orjson.loads(response.content)["jobs"])
+        return statuses
 
     def wait_for_completion(
-        self, job_id: str, timeout: int = 300, poll_interval: int = 2
+        self,
+        job_id: str,
+        timeout: int = 300,
+        initial_delay: float = 0.3,
+        max_delay: float = 3.0,
+        factor: float = 1.25,
     ) -> Dict[str, Any]:
-        """Wait for job to complete."""
-        start_time = time.time()
+        """Wait for job to complete.
+
+        Polls quickly at first so short jobs return promptly, then backs off
+        geometrically up to max_delay so long jobs are not polled as often.
+        """
+        deadline = time.monotonic() + timeout
+        delay = initial_delay
         print(f"Waiting for job {job_id} to complete...")
 
-        while time.time() - start_time < timeout:
+        while True:
             status = self.get_job_status(job_id)
             job_status = status["status"]
             progress = status.get("progress", {})
@@ -62,26 +133,71 @@ class AuditAgentClient:
                 flush=True,
             )
 
-            if job_status in ["succeeded", "failed", "canceled", "expired"]:
+            if job_status in TERMINAL_STATUSES:
                 print()  # New line
                 return status
 
-            time.sleep(poll_interval)
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+
+            time.sleep(min(delay, remaining))
+            delay = min(delay * factor, max_delay)
 
         print()  # New line
         raise TimeoutError(f"Job {job_id} did not complete within {timeout} seconds")
 
+    def wait_for_completion_many(
+        self,
+        job_ids: List[str],
+        timeout: int = 300,
+        initial_delay: float = 0.3,
+        max_delay: float = 3.0,
+        factor: float = 1.25,
+    ) -> Dict[str, Dict[str, Any]]:
+        """Wait for several jobs to complete, polling them in one request per tick."""
+        deadline = time.monotonic() + timeout
+        delay = initial_delay
+        pending = list(dict.fromkeys(job_ids))
+        finished = {}
+
+        while True:
+            statuses = self.get_jobs_status(pending)
+            for job_id, status in statuses.items():
+                if status["status"] in TERMINAL_STATUSES:
+                    finished[job_id] = status
+            pending = [job_id for job_id in pending if job_id not in finished]
+            print(f"\r{len(finished)}/{len(finished) + len(pending)} jobs done", end="")
+
+            if not pending:
+                print()  # New line
+                return finished
+
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+
+            time.sleep(min(delay, remaining))
+            delay = min(delay * factor, max_delay)
+
+        print()  # New line
+        raise TimeoutError(f"Jobs {pending} did not complete within {timeout} seconds")
+
+    def close(self) -> None:
+        """Close pooled connections."""
+        self.client.close()
+
     def get_report(self, job_id: str) -> str:
         """Get audit report."""
-        response = self.session.get(f"{self.base_url}/jobs/{job_id}/report")
+        response = self.client.get(f"/jobs/{job_id}/report")
         response.raise_for_status()
         return response.text
 
     def cancel_job(self, job_id: str) -> Dict[str, Any]:
         """Cancel a job."""
-        response = self.session.post(f"{self.base_url}/jobs/{job_id}/cancel")
+        response = self.client.post(f"/jobs/{job_id}/cancel")
         response.raise_for_status()
-        return response.json()
+        return orjson.loads(response.content)
 
 
 def main():
@@ -185,12 +301,15 @@ def main():
         print("- Experiment with different audit profiles")
         print("- Check the full API documentation in README.md")
 
-    except requests.exceptions.RequestException as e:
+    except httpx.HTTPStatusError as e:
+        print(f"❌ Request failed: {e}")
+        print(f"Response: {e.response.text}")
+    except httpx.HTTPError as e:
         print(f"❌ Request failed: {e}")
-        if hasattr(e, "response") and e.response is not None:
-            print(f"Response: {e.response.text}")
     except Exception as e:
         print(f"❌ Error: {e}")
+    finally:
+        client.close()
 
 
 if __name__ == "__main__":
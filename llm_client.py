@@ -1,11 +1,13 @@
 """LLM client with MCP agent integration and DRY_RUN fallback."""
 
 import asyncio
+import hashlib
 import random
-import time
+from collections import OrderedDict
 from typing import Dict, Any, Tuple, Optional
 
 import httpx
+import orjson
 from loguru import logger
 
 from settings import settings
@@ -15,6 +17,126 @@ from mcp_manager import initialize_mcp_manager, shutdown_mcp_manager, get_mcp_ma
 from agent import initialize_audit_agent, shutdown_audit_agent, get_audit_agent
 
 
+# Idle connections are kept long enough to skip the TLS handshake between
+# bursts of calls
+_HTTP_LIMITS = httpx.Limits(
+    max_connections=settings.llm_max_connections,
+    max_keepalive_connections=settings.llm_max_keepalive,
+    keepalive_expiry=settings.llm_keepalive_expiry_sec,
+)
+
+# Caps in-flight agent and OpenRouter calls so bursts of jobs queue here
+# instead of exhausting the pool and tripping the provider's rate limit
+_MAX_CONCURRENT_CALLS = settings.max_concurrent_llm_calls or 16
+
+_DRY_RUN_DELAY = settings.dry_run_simulated_delay
+
+# Rough (input, output) USD cost per token for common models, from per-1M prices
+_MODEL_COSTS_PER_TOKEN = {
+    model: (input_per_million / 1_000_000, output_per_million / 1_000_000)
+    for model, (input_per_million, output_per_million) in {
+        "anthropic/claude-3.5-sonnet": (3.0, 15.0),
+        "openai/gpt-4": (30.0, 60.0),
+        "openai/gpt-3.5-turbo": (0.5, 1.5),
+    }.items()
+}
+_DEFAULT_COST_PER_TOKEN = (1.0 / 1_000_000, 2.0 / 1_000_000)
+
+# Recent OpenRouter results are reused for repeat audits of the same code
+_RESULT_CACHE_SIZE = 128
+_RESULT_CACHE_TTL_SEC = 300.0
+
+
+# Analysis prompt for each audit profile; "{code}" marks where the source goes
+_PROFILE_PROMPTS = {
+    "erc20_basic_v1": """
+Analyze this smart contract code for ERC20 compliance and common vulnerabilities:
+
+1. ERC20 Standard Compliance:
+   - Check if all required functions are implemented
+   - Verify function signatures and return values
+   - Ensure proper event emissions
+
+2. Security Issues:
+   - Reentrancy vulnerabilities
+   - Integer overflow/underflow
+   - Access control issues
+   - Front-running vulnerabilities
+   - Gas optimization issues
+
+3. Code Quality:
+   - Unused variables or functions
+   - Missing error handling
+   - Inconsistent naming conventions
+
+Please provide a detailed report with:
+- Summary of findings
+- List of issues with severity levels (high/medium/low)
+- Specific locations and descriptions
+- Recommendations for fixes
+- Gas optimization suggestions
+
+Code to analyze:
+```solidity
+{code}
+```
+""",
+    "general_v1": """
+Perform a comprehensive security audit of this smart contract code:
+
+1. Security Vulnerabilities:
+   - Reentrancy attacks
+   - Integer overflow/underflow
+   - Access control bypass
+   - Front-running attacks
+   - Denial of service
+   - Logic errors
+
+2. Best Practices:
+   - Code organization and structure
+   - Error handling
+   - Gas optimization
+   - Documentation and comments
+
+3. Compliance:
+   - Standard compliance (ERC20, ERC721, etc.)
+   - Regulatory considerations
+
+Please provide a detailed report with:
+- Executive summary
+- Detailed findings with severity levels
+- Code locations and explanations
+- Specific recommendations
+- Risk assessment
+
+Code to analyze:
+```solidity
+{code}
+```
+""",
+}
+
+
+_SYSTEM_PROMPT = (
+    "You are an expert smart contract auditor. Analyze the provided code and "
+    "generate a comprehensive audit report."
+)
+
+
+# Prompts split around the code placeholder once, so building one is a concat
+_PROMPT_PARTS = {
+    profile: tuple(template.split("{code}"))
+    for profile, template in _PROFILE_PROMPTS.items()
+}
+
+# The same parts as JSON string fragments: the prefix is left unclosed and the
+# suffix unopened so the encoded code can be spliced between them
+_PROMPT_JSON_PARTS = {
+    profile: (orjson.dumps(prefix)[:-1], orjson.dumps(suffix)[1:])
+    for profile, (prefix, suffix) in _PROMPT_PARTS.items()
+}
+
+
 class LLMClient:
     """Client with MCP agent integration, OpenRouter API fallback, and DRY_RUN mode."""
 
@@ -29,10 +151,34 @@ class LLMClient:
         self.mcp_manager = None
         self.audit_agent = None
         self.agent_initialized = False
+        self._sem = asyncio.Semaphore(_MAX_CONCURRENT_CALLS)
+
+        # Identical requests share one call: in-flight futures and recent results
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._results: OrderedDict[str, Tuple[float, Tuple[str, Dict[str, Any]]]] = (
+            OrderedDict()
+        )
+
+        # Request body split around the user prompt, which is kept last so
+        # the trailing null is its placeholder
+        template = orjson.dumps(
+            {
+                "model": self.model,
+                "max_tokens": 8000,
+                "temperature": 0.1,
+                "stream": True,
+                "messages": [
+                    {"role": "system", "content": _SYSTEM_PROMPT},
+                    {"role": "user", "content": None},
+                ],
+            }
+        )
+        self._payload_prefix, self._payload_suffix = template.rsplit(b"null", 1)
 
         # HTTP client with timeout (for fallback)
         self.client = httpx.AsyncClient(
             timeout=httpx.Timeout(60.0),
+            limits=_HTTP_LIMITS,
             headers={
                 "Authorization": f"Bearer {self.api_key}" if self.api_key else "",
                 "Content-Type": "application/json",
@@ -105,9 +251,10 @@ class LLMClient:
                 
                 if self.audit_agent:
                     logger.info(f"Using MCP agent for job {job_id}")
-                    result = await self.audit_agent.audit_contract(
-                        code, audit_profile, job_id, payload
-                    )
+                    async with self._sem:
+                        result = await self.audit_agent.audit_contract(
+                            code, audit_profile, job_id, payload
+                        )
                     
                     if result.get("error"):
                         logger.warning(f"MCP agent error: {result['error']}")
@@ -136,8 +283,9 @@ class LLMClient:
         """Generate deterministic report for DRY_RUN mode."""
         logger.info(f"Generating DRY_RUN report for job {job_id}")
 
-        # Simulate processing time
-        await asyncio.sleep(random.uniform(2, 5))
+        # Optionally simulate LLM latency; off by default so tests and CI don't wait
+        if _DRY_RUN_DELAY:
+            await asyncio.sleep(_DRY_RUN_DELAY)
 
         # Generate deterministic report
         report_content = generate_deterministic_report(payload, job_id)
@@ -156,47 +304,89 @@ class LLMClient:
 
     async def _call_openrouter_api(
         self, code: str, audit_profile: str, job_id: str
+    ) -> Tuple[str, Dict[str, Any]]:
+        """Call OpenRouter API, sharing the result between identical requests."""
+        key = hashlib.blake2b(
+            f"{self.model}|{audit_profile}|{code}".encode(), digest_size=16
+        ).hexdigest()
+        loop = asyncio.get_running_loop()
+
+        cached = self._results.get(key)
+        if cached and cached[0] > loop.time():
+            logger.info(f"Reusing recent OpenRouter result for job {job_id}")
+            return self._shared_result(cached[1])
+
+        inflight = self._inflight.get(key)
+        if inflight:
+            logger.info(f"Joining in-flight OpenRouter call for job {job_id}")
+            try:
+                return self._shared_result(await asyncio.shield(inflight))
+            except asyncio.CancelledError:
+                # Only the leader's job was cancelled; make the call for this one
+                if not inflight.cancelled() or asyncio.current_task().cancelling():
+                    raise
+            logger.info(f"Shared OpenRouter call was cancelled, retrying for job {job_id}")
+            return await self._call_openrouter_api(code, audit_profile, job_id)
+
+        future = loop.create_future()
+        self._inflight[key] = future
+        try:
+            result = await self._request_completion(code, audit_profile, job_id)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Mark retrieved so an unjoined failure isn't logged twice
+            future.exception()
+            raise
+        finally:
+            del self._inflight[key]
+
+        future.set_result(result)
+        self._results[key] = (loop.time() + _RESULT_CACHE_TTL_SEC, result)
+        self._results.move_to_end(key)
+        if len(self._results) > _RESULT_CACHE_SIZE:
+            self._results.popitem(last=False)
+        return result
+
+    @staticmethod
+    def _shared_result(
+        result: Tuple[str, Dict[str, Any]],
+    ) -> Tuple[str, Dict[str, Any]]:
+        """Copy of another job's result whose metrics don't count the call again."""
+        content, metrics = result
+        return content, {**metrics, "calls": 0, "cost_usd": 0.0}
+
+    async def _request_completion(
+        self, code: str, audit_profile: str, job_id: str
     ) -> Tuple[str, Dict[str, Any]]:
         """Call OpenRouter API with retry logic."""
         logger.info(f"Calling OpenRouter API for job {job_id}")
 
-        # Prepare prompt based on audit profile
-        prompt = self._build_prompt(code, audit_profile)
-
-        # Prepare request payload
-        payload = {
-            "model": self.model,
-            "messages": [
-                {
-                    "role": "system",
-                    "content": "You are an expert smart contract auditor. Analyze the provided code and generate a comprehensive audit report.",
-                },
-                {"role": "user", "content": prompt},
-            ],
-            "max_tokens": 8000,
-            "temperature": 0.1,
-        }
+        body = self._build_body(code, audit_profile)
 
         # Retry logic with exponential backoff
         max_retries = 3
-        base_delay = 1.0
+        loop = asyncio.get_running_loop()
 
         for attempt in range(max_retries):
             try:
-                start_time = time.time()
-
-                response = await self.client.post(
-                    f"{self.base_url}/chat/completions", json=payload
-                )
+                # Only the request holds a slot; backoff sleeps do not
+                async with self._sem:
+                    start_time = loop.time()
+                    async with self.client.stream(
+                        "POST", f"{self.base_url}/chat/completions", content=body
+                    ) as response:
+                        if response.status_code == 200:
+                            content, usage = await self._read_stream(response)
+                        else:
+                            await response.aread()
 
-                elapsed = time.time() - start_time
+                elapsed = loop.time() - start_time
 
                 if response.status_code == 200:
-                    data = response.json()
-                    content = data["choices"][0]["message"]["content"]
-
                     # Extract usage metrics
-                    usage = data.get("usage", {})
                     metrics = {
                         "calls": 1,
                         "prompt_tokens": usage.get("prompt_tokens", 0),
@@ -211,7 +401,7 @@ class LLMClient:
 
                 elif response.status_code == 429:
                     # Rate limit - exponential backoff with jitter
-                    delay = base_delay * (2**attempt) + random.uniform(0, 1)
+                    delay = self._backoff_delay(attempt)
                     logger.warning(
                         f"Rate limited, retrying in {delay:.2f}s (attempt {attempt + 1})"
                     )
@@ -220,7 +410,7 @@ class LLMClient:
 
                 elif response.status_code >= 500:
                     # Server error - retry with backoff
-                    delay = base_delay * (2**attempt) + random.uniform(0, 1)
+                    delay = self._backoff_delay(attempt)
                     logger.warning(
                         f"Server error {response.status_code}, retrying in {delay:.2f}s (attempt {attempt + 1})"
                     )
@@ -234,7 +424,7 @@ class LLMClient:
                     raise Exception(error_msg)
 
             except httpx.TimeoutException:
-                delay = base_delay * (2**attempt) + random.uniform(0, 1)
+                delay = self._backoff_delay(attempt)
                 logger.warning(
                     f"Timeout, retrying in {delay:.2f}s (attempt {attempt + 1})"
                 )
@@ -247,7 +437,7 @@ class LLMClient:
                         f"OpenRouter API call failed after {max_retries} attempts: {e}"
                     )
                     raise
-                delay = base_delay * (2**attempt) + random.uniform(0, 1)
+                delay = self._backoff_delay(attempt)
                 logger.warning(
                     f"API call failed, retrying in {delay:.2f}s (attempt {attempt + 1}): {e}"
                 )
@@ -255,98 +445,85 @@ class LLMClient:
 
         raise Exception("OpenRouter API call failed after all retries")
 
+    @staticmethod
+    def _backoff_delay(
+        attempt: int, base: float = 0.5, factor: float = 1.5, cap: float = 8.0
+    ) -> float:
+        """Retry delay: gentle exponential growth, capped, with +/-50% jitter."""
+        return min(cap, base * factor**attempt) * random.uniform(0.5, 1.5)
+
+    @staticmethod
+    async def _read_stream(response: httpx.Response) -> Tuple[str, Dict[str, int]]:
+        """Collect the content deltas and final usage from an SSE completion."""
+        parts = []
+        usage = {}
+        async for line in response.aiter_lines():
+            # Skip blank event separators and ": OPENROUTER PROCESSING" comments
+            if not line.startswith("data: "):
+                continue
+            data = line[6:]
+            if data == "[DONE]":
+                break
+            chunk = orjson.loads(data)
+            if "error" in chunk:
+                raise Exception(f"OpenRouter stream error: {chunk['error']}")
+            if chunk.get("choices"):
+                parts.append(chunk["choices"][0].get("delta", {}).get("content") or "")
+            if chunk.get("usage"):
+                usage = chunk["usage"]
+        return "".join(parts), usage
+
     def _build_prompt(self, code: str, audit_profile: str) -> str:
         """Build prompt for code analysis."""
-        profile_prompts = {
-            "erc20_basic_v1": """
-Analyze this smart contract code for ERC20 compliance and common vulnerabilities:
-
-1. ERC20 Standard Compliance:
-   - Check if all required functions are implemented
-   - Verify function signatures and return values
-   - Ensure proper event emissions
-
-2. Security Issues:
-   - Reentrancy vulnerabilities
-   - Integer overflow/underflow
-   - Access control issues
-   - Front-running vulnerabilities
-   - Gas optimization issues
-
-3. Code Quality:
-   - Unused variables or functions
-   - Missing error handling
-   - Inconsistent naming conventions
-
-Please provide a detailed report with:
-- Summary of findings
-- List of issues with severity levels (high/medium/low)
-- Specific locations and descriptions
-- Recommendations for fixes
-- Gas optimization suggestions
-
-Code to analyze:
-```solidity
-{code}
-```
-""",
-            "general_v1": """
-Perform a comprehensive security audit of this smart contract code:
-
-1. Security Vulnerabilities:
-   - Reentrancy attacks
-   - Integer overflow/underflow
-   - Access control bypass
-   - Front-running attacks
-   - Denial of service
-   - Logic errors
+        prefix, suffix = _PROMPT_PARTS.get(audit_profile, _PROMPT_PARTS["general_v1"])
+        return f"{prefix}{code}{suffix}"
 
-2. Best Practices:
-   - Code organization and structure
-   - Error handling
-   - Gas optimization
-   - Documentation and comments
-
-3. Compliance:
-   - Standard compliance (ERC20, ERC721, etc.)
-   - Regulatory considerations
+    def _build_body(self, code: str, audit_profile: str) -> bytes:
+        """Build the request body with the code spliced into the encoded prompt."""
+        prefix, suffix = _PROMPT_JSON_PARTS.get(
+            audit_profile, _PROMPT_JSON_PARTS["general_v1"]
+        )
+        # Only the code is encoded per call; its quotes are dropped so it
+        # continues the prompt's JSON string
+        return b"".join(
+            (
+                self._payload_prefix,
+                prefix,
+                memoryview(orjson.dumps(code))[1:-1],
+                suffix,
+                self._payload_suffix,
+            )
+        )
 
-Please provide a detailed report with:
-- Executive summary
-- Detailed findings with severity levels
-- Code locations and explanations
-- Specific recommendations
-- Risk assessment
+    def _calculate_cost(self, usage: Dict[str, int]) -> float:
+        """Calculate approximate cost based on usage."""
+        input_cost, output_cost = _MODEL_COSTS_PER_TOKEN.get(
+            self.model, _DEFAULT_COST_PER_TOKEN
+        )
+        return (
+            usage.get("prompt_tokens", 0) * input_cost
+            + usage.get("completion_tokens", 0) * output_cost
+        )
 
-Code to analyze:
-```solidity
-{code}
-```
-""",
-        }
 
-        base_prompt = profile_prompts.get(audit_profile, profile_prompts["general_v1"])
-        return base_prompt.format(code=code)
+# Global LLM client instance, created on first use
+llm_client: Optional[LLMClient] = None
 
-    def _calculate_cost(self, usage: Dict[str, int]) -> float:
-        """Calculate approximate cost based on usage."""
-        # Rough cost estimates for common models (per 1M tokens)
-        model_costs = {
-            "anthropic/claude-3.5-sonnet": {"input": 3.0, "output": 15.0},
-            "openai/gpt-4": {"input": 30.0, "output": 60.0},
-            "openai/gpt-3.5-turbo": {"input": 0.5, "output": 1.5},
-        }
 
-        costs = model_costs.get(self.model, {"input": 1.0, "output": 2.0})
+def get_llm_client() -> LLMClient:
+    """Get the global LLM client, creating it on first use."""
+    global llm_client
 
-        input_tokens = usage.get("prompt_tokens", 0)
-        output_tokens = usage.get("completion_tokens", 0)
+    if llm_client is None:
+        llm_client = LLMClient()
 
-        input_cost = (input_tokens / 1_000_000) * costs["input"]
-        output_cost = (output_tokens / 1_000_000) * costs["output"]
+    return llm_client
 
-        return input_cost + output_cost
 
+async def close_llm_client():
+    """Close the global LLM client if it was created."""
+    global llm_client
 
-# Global LLM client instance
-llm_client = LLMClient()
+    if llm_client:
+        await llm_client.close()
+        llm_client = None
@@ -1,5 +1,7 @@
 """MCP configuration schemas and settings."""
 
+import os
+from functools import cached_property
 from typing import List, Optional, Dict, Any, Literal
 from pydantic import BaseModel, Field
 
@@ -40,6 +42,12 @@ class AgentConfig(BaseModel):
     enable_reasoning: bool = Field(True, description="Enable step-by-step reasoning")
     enable_tool_selection: bool = Field(True, description="Enable automatic tool selection")
     enable_parallel_tools: bool = Field(False, description="Enable parallel tool execution")
+    max_parallel_tools: int = Field(4, description="Maximum tool batches (one per MCP server and turn) executed concurrently")
+    fast_path: bool = Field(False, description="Call OpenAI-compatible chat completions directly instead of through LangChain")
+    
+    # Context management
+    window_size: int = Field(12, description="Recent messages sent verbatim to the LLM")
+    summary_token_budget: int = Field(4000, description="Tokens of older messages kept before summarizing")
 
 
 class MCPConfig(BaseModel):
@@ -52,11 +60,20 @@ class MCPConfig(BaseModel):
     enable_mcp: bool = Field(True, description="Enable MCP functionality")
     fallback_to_direct: bool = Field(True, description="Fallback to direct LLM if MCP fails")
     debug_mode: bool = Field(False, description="Enable debug logging")
+    
+    @cached_property
+    def enabled_servers(self) -> List[MCPServerConfig]:
+        """Enabled servers, highest priority first (ties keep their listed order)."""
+        return sorted(
+            (server for server in self.servers if server.enabled),
+            key=lambda server: server.priority,
+            reverse=True,
+        )
 
 
-# Default MCP server configurations
+# Default MCP server configurations; trusted literals, so validation is skipped
 DEFAULT_MCP_SERVERS = [
-    MCPServerConfig(
+    MCPServerConfig.model_construct(
         name="blockscout",
         transport="http",
         url="https://mcp.blockscout.com/mcp",
@@ -66,19 +83,22 @@ DEFAULT_MCP_SERVERS = [
 ]
 
 
+# Environment overrides, read once at import
+_MODEL = os.environ.get("OPENROUTER_MODEL", "anthropic/claude-3.5-sonnet")
+_ENABLE_MCP = os.environ.get("ENABLE_MCP", "true").lower() == "true"
+_FALLBACK_TO_DIRECT = os.environ.get("MCP_FALLBACK_TO_DIRECT", "true").lower() == "true"
+_DEBUG_MODE = os.environ.get("MCP_DEBUG", "false").lower() == "true"
+
+
 def load_mcp_config() -> MCPConfig:
     """Load MCP configuration from environment or use defaults."""
-    import os
-    
-    # Get model from environment or use default
-    model = os.getenv("OPENROUTER_MODEL", "anthropic/claude-3.5-sonnet")
-    
     # For now, return default config
     # In production, this could load from YAML/JSON config files
-    return MCPConfig(
-        servers=DEFAULT_MCP_SERVERS,
-        agent=AgentConfig(model=model),
-        enable_mcp=os.getenv("ENABLE_MCP", "true").lower() == "true",
-        fallback_to_direct=os.getenv("MCP_FALLBACK_TO_DIRECT", "true").lower() == "true",
-        debug_mode=os.getenv("MCP_DEBUG", "false").lower() == "true",
+    # Every value is a literal or a parsed flag, so skip re-validating them
+    return MCPConfig.model_construct(
+        servers=list(DEFAULT_MCP_SERVERS),
+        agent=AgentConfig.model_construct(model=_MODEL),
+        enable_mcp=_ENABLE_MCP,
+        fallback_to_direct=_FALLBACK_TO_DIRECT,
+        debug_mode=_DEBUG_MODE,
     )
@@ -1,336 +1,431 @@
 """MCP client manager for handling multiple MCP servers."""
 
 import asyncio
+import itertools
 import os
-from typing import Dict, List, Optional, Any
+from contextlib import aclosing
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Any, Tuple
 
+import httpx
+import orjson
+from langchain_core.tools import BaseTool
 from loguru import logger
 from mcp import ClientSession, StdioServerParameters
 from mcp.client.stdio import stdio_client
-from mcp.client.streamable_http import create_mcp_http_client
+from mcp.types import TextContent
 
 from mcp_config import MCPConfig, MCPServerConfig
 
 
+# Servers connected at once during MCPManager.initialize
+_MAX_CONCURRENT_CONNECTS = 8
+
+# Headers shared by every JSON-RPC request to HTTP MCP servers
+_RPC_HEADERS = {
+    "Content-Type": "application/json",
+    "Accept": "application/json, text/event-stream",
+    "User-Agent": "MCP-Client/1.0",
+}
+
+# JSON replies larger than this are parsed off the event loop
+_OFFLOAD_PARSE_BYTES = 64 * 1024
+
+# Pool shared by all HTTP MCP servers, kept warm across tool calls to skip reconnects
+_HTTP_LIMITS = httpx.Limits(
+    max_connections=256, max_keepalive_connections=64, keepalive_expiry=30
+)
+
+
+def _new_http_client() -> httpx.AsyncClient:
+    """Create a pooled HTTP/2 client; per-server headers and timeouts go on each request."""
+    return httpx.AsyncClient(http2=True, limits=_HTTP_LIMITS, follow_redirects=True)
+
+
+@dataclass(slots=True)
+class _RpcTool:
+    """Tool entry from a tools/list response, read like mcp.types.Tool."""
+    name: str
+    description: str
+    inputSchema: dict
+    meta: Optional[dict] = None
+
+
+@dataclass(slots=True)
+class _RpcResource:
+    """Resource entry from a resources/list response, read like mcp.types.Resource."""
+    uri: str
+    name: str
+    description: str
+    mimeType: str
+
+
+@dataclass(slots=True)
+class _ToolsResult:
+    """tools/list result, shaped like the MCP SDK's ListToolsResult."""
+    tools: list
+
+
+@dataclass(slots=True)
+class _ResourcesResult:
+    """resources/list result, shaped like the MCP SDK's ListResourcesResult."""
+    resources: list
+
+
+@dataclass(slots=True)
+class _ToolResult:
+    """tools/call result, shaped like the MCP SDK's CallToolResult."""
+    content: list
+    isError: bool
+
+
+def _sse_payload(line: bytes) -> bytes:
+    """Return the JSON payload of a "data:" or bare JSON line (empty for blank lines)."""
+    line = line.strip()
+    if line.startswith(b"data:"):
+        line = line[5:].strip()
+    return line
+
+
+async def _aloads(data: bytes) -> Any:
+    """Parse JSON, in a worker thread for bodies large enough to stall the event loop."""
+    if len(data) > _OFFLOAD_PARSE_BYTES:
+        return await asyncio.get_running_loop().run_in_executor(None, orjson.loads, data)
+    return orjson.loads(data)
+
+
+async def _iter_lines(response: httpx.Response):
+    """Yield the lines of a streamed body as each one completes.
+
+    Lines are split from the raw bytes, so the body is never decoded to
+    text. An unfinished line is extended in place until its newline
+    arrives, so a frame spread over many chunks is copied once, not once
+    per chunk.
+    """
+    pending = bytearray()
+    async for chunk in response.aiter_bytes():
+        end = chunk.rfind(b"\n")
+        if end < 0:
+            pending += chunk
+            continue
+        pending += memoryview(chunk)[:end]
+        for line in pending.split(b"\n"):
+            yield line
+        pending = bytearray(memoryview(chunk)[end + 1:])
+    yield pending
+
+
+async def _iter_sse_json(response: httpx.Response):
+    """Yield JSON payloads from a streamed SSE body, skipping non-JSON lines."""
+    async for line in _iter_lines(response):
+        payload = _sse_payload(line)
+        if not payload:
+            continue
+        try:
+            yield await _aloads(payload)
+        except orjson.JSONDecodeError:
+            continue
+
+
 class MockHTTPSession:
     """Mock MCP session for HTTP transport."""
     
-    def __init__(self, base_url: str, http_client):
+    def __init__(self, base_url: str, http_client, headers: Optional[Dict[str, str]] = None, timeout: Optional[float] = None, owns_client: bool = True):
         self.base_url = base_url.rstrip('/')
         self.http_client = http_client
+        # The client may be shared with other servers, so this server's headers
+        # and timeout are sent with each request
+        self.headers = {**(headers or {}), **_RPC_HEADERS}
+        self.timeout = httpx.Timeout(timeout) if timeout is not None else httpx.USE_CLIENT_DEFAULT
+        self.owns_client = owns_client
+        # Cleared once the server refuses a JSON-RPC batch; later calls go out singly
+        self.batch_supported = True
+        # Listings fetched by warmup, handed out once by the next list_* call
+        self._preloaded_tools: Optional[_ToolsResult] = None
+        self._preloaded_resources: Optional[_ResourcesResult] = None
         self.initialized = False
+        self.http_version: Optional[str] = None
+        self._rpc_id = itertools.count()
     
-    async def initialize(self):
-        """Perform MCP initialize over HTTP JSON-RPC."""
-        payload = {"jsonrpc": "2.0", "id": 0, "method": "initialize", "params": {"capabilities": {}}}
-        try:
-            # Try JSON first
-            resp = await self.http_client.post(
-                self.base_url,
-                json=payload,
-                headers={"Content-Type": "application/json", "Accept": "application/json, text/event-stream"}
-            )
-            if resp.status_code == 200 and resp.headers.get("content-type","").startswith("application/json"):
-                data = resp.json()
-                self.initialized = True
-                logger.info(f"Initialized MCP HTTP session at {self.base_url}")
+    async def _rpc(self, method: str, params: Dict[str, Any]):
+        """Send one JSON-RPC request and yield each JSON message of the reply.
+        
+        A plain JSON reply yields one message; an SSE reply yields messages as
+        they arrive. Non-200 replies are logged and yield nothing.
+        """
+        payload = {"jsonrpc": "2.0", "id": next(self._rpc_id), "method": method, "params": params}
+        async with aclosing(self._post(method, payload)) as messages:
+            async for data in messages:
+                yield data
+    
+    async def _post(self, label: str, payload: Any):
+        """POST a JSON-RPC request or batch and yield each JSON message of the reply."""
+        async with self.http_client.stream(
+            "POST", self.base_url, content=orjson.dumps(payload), headers=self.headers, timeout=self.timeout
+        ) as resp:
+            self.http_version = resp.http_version
+            if resp.status_code != 200:
+                await resp.aread()
+                logger.warning(f"{label} {self.base_url} -> {resp.status_code} {resp.text[:300]}")
                 return
-            elif resp.status_code != 200:
-                logger.warning(f"initialize {self.base_url} -> {resp.status_code} {resp.text[:300]}")
+            
+            if resp.headers.get("content-type", "").startswith("application/json"):
+                yield await _aloads(await resp.aread())
                 return
             
-            # Handle SSE response
-            async with self.http_client.stream(
-                "POST", self.base_url,
-                json=payload,
-                headers={"Content-Type": "application/json", "Accept": "application/json, text/event-stream"}
-            ) as s:
-                buf = ""
-                async for chunk in s.aiter_text():
-                    buf += chunk
-                    for raw in buf.splitlines():
-                        line = raw.strip()
-                        if not line:
-                            continue
-                        # accept both "data: {...}" and plain "{...}"
-                        if line.startswith("data:"):
-                            line = line[5:].strip(": ").strip()
-                        try:
-                            import json as _json
-                            data = _json.loads(line)
-                            # tolerate servers that omit result or return ack only
-                            self.initialized = True
-                            logger.info(f"Initialized MCP HTTP session at {self.base_url}")
-                            return
-                        except Exception:
-                            continue
+            async for data in _iter_sse_json(resp):
+                yield data
+    
+    async def initialize(self):
+        """Perform MCP initialize over HTTP JSON-RPC."""
+        try:
+            async with aclosing(self._rpc("initialize", {"capabilities": {}})) as messages:
+                async for _ in messages:
+                    # tolerate servers that omit result or return ack only
+                    self.initialized = True
+                    # HTTP/2 is negotiated via TLS ALPN, so plain http:// stays on HTTP/1.1
+                    logger.info(f"Initialized MCP HTTP session at {self.base_url} over {self.http_version}")
+                    return
         except Exception as e:
             logger.error(f"initialize failed for {self.base_url}: {e}")
     
+    async def warmup(self):
+        """Initialize and fetch both listings concurrently.
+        
+        The three requests go out at once (multiplexed over HTTP/2 where
+        available) and non-empty listings are kept for the next list_tools
+        and list_resources calls. Servers that refuse requests before the
+        initialize handshake return empty listings, which are left out so the
+        next call queries again after initialize.
+        """
+        _, tools, resources = await asyncio.gather(
+            self.initialize(), self.list_tools(), self.list_resources()
+        )
+        self._preloaded_tools = tools if tools.tools else None
+        self._preloaded_resources = resources if resources.resources else None
+    
     async def list_tools(self):
         """List available tools using JSON-RPC with support for both JSON and SSE."""
-        payload = {"jsonrpc": "2.0", "id": 1, "method": "tools/list", "params": {}}
-        url = self.base_url  # honor configured URL exactly
-
+        if self._preloaded_tools is not None:
+            result, self._preloaded_tools = self._preloaded_tools, None
+            return result
         try:
-            # First try plain JSON
-            resp = await self.http_client.post(
-                url, json=payload,
-                headers={
-                    "Content-Type": "application/json", 
-                    "Accept": "application/json, text/event-stream",
-                    "User-Agent": "MCP-Client/1.0"
-                }
-            )
-            if resp.status_code == 200 and resp.headers.get("content-type","").startswith("application/json"):
-                data = resp.json()
-                parsed = self._parse_tools_json(data)
-                if not getattr(parsed, "tools", []):
-                    logger.warning(f"tools/list 200 but empty from {self.base_url}: {str(data)[:300]}")
-                return parsed
-
-            # Otherwise fall back to SSE streaming with robust parsing
-            async with self.http_client.stream(
-                "POST", url,
-                json=payload,
-                headers={"Content-Type": "application/json", "Accept": "application/json, text/event-stream"}
-            ) as s:
-                buf = ""
-                async for chunk in s.aiter_text():
-                    buf += chunk
-                    for raw in buf.splitlines():
-                        line = raw.strip()
-                        if not line:
-                            continue
-                        # accept both "data: {...}" and plain "{...}"
-                        if line.startswith("data:"):
-                            line = line[5:].strip(": ").strip()
-                        try:
-                            import json as _json
-                            data = _json.loads(line)
-                            result = self._parse_tools_json(data)
-                            if result and getattr(result, "tools", []):
-                                return result
-                        except Exception:
-                            continue
-                # if we got here, fall through to empty
-                return type('ToolsResult', (), {'tools': []})()
+            async with aclosing(self._rpc("tools/list", {})) as messages:
+                async for data in messages:
+                    result = self._parse_tools_json(data)
+                    if result.tools:
+                        return result
+            logger.warning(f"tools/list returned no tools from {self.base_url}")
         except Exception as e:
             logger.error(f"Failed to list tools from {self.base_url}: {e}")
-            return type('ToolsResult', (), {'tools': []})()
+        return _ToolsResult([])
     
     def _parse_tools_json(self, data):
         """Parse tools from JSON response."""
         try:
-            logger.debug(f"Parsing tools JSON from {self.base_url}: {str(data)[:500]}")
+            # Lazy so the payload is only stringified when DEBUG is enabled
+            logger.opt(lazy=True).debug(
+                "Parsing tools JSON from {}: {}", lambda: self.base_url, lambda: str(data)[:500]
+            )
             if "result" in data and "tools" in data["result"]:
-                from mcp.types import Tool
-                tools = [Tool(
+                tools = [_RpcTool(
                     name=t["name"],
-                    description=t.get("description",""),
-                    inputSchema=t.get("inputSchema", {})
+                    description=t.get("description") or "",
+                    inputSchema=t.get("inputSchema") or {},
+                    meta=t.get("_meta"),
                 ) for t in data["result"]["tools"]]
                 logger.info(f"Found {len(tools)} tools from {self.base_url}")
-                return type('ToolsResult', (), {'tools': tools})()
+                return _ToolsResult(tools)
             else:
                 logger.warning(f"No tools in result from {self.base_url}: {str(data)[:300]}")
         except Exception as e:
             logger.warning(f"Bad tools payload from {self.base_url}: {e}")
-        return type('ToolsResult', (), {'tools': []})()
+        return _ToolsResult([])
     
     async def list_resources(self):
         """List available resources using JSON-RPC with support for both JSON and SSE."""
-        payload = {"jsonrpc": "2.0", "id": 2, "method": "resources/list", "params": {}}
-        url = self.base_url
-
+        if self._preloaded_resources is not None:
+            result, self._preloaded_resources = self._preloaded_resources, None
+            return result
         try:
-            # First try plain JSON
-            resp = await self.http_client.post(
-                url, json=payload,
-                headers={"Content-Type": "application/json", "Accept": "application/json, text/event-stream"}
-            )
-            if resp.status_code == 200 and resp.headers.get("content-type","").startswith("application/json"):
-                data = resp.json()
-                parsed = self._parse_resources_json(data)
-                if not getattr(parsed, "resources", []):
-                    logger.warning(f"resources/list 200 but empty from {self.base_url}: {str(data)[:300]}")
-                return parsed
-
-            # Otherwise fall back to SSE streaming with robust parsing
-            async with self.http_client.stream(
-                "POST", url,
-                json=payload,
-                headers={"Content-Type": "application/json", "Accept": "application/json, text/event-stream"}
-            ) as s:
-                buf = ""
-                async for chunk in s.aiter_text():
-                    buf += chunk
-                    for raw in buf.splitlines():
-                        line = raw.strip()
-                        if not line:
-                            continue
-                        # accept both "data: {...}" and plain "{...}"
-                        if line.startswith("data:"):
-                            line = line[5:].strip(": ").strip()
-                        try:
-                            import json as _json
-                            data = _json.loads(line)
-                            result = self._parse_resources_json(data)
-                            if result and getattr(result, "resources", []):
-                                return result
-                        except Exception:
-                            continue
-                return type('ResourcesResult', (), {'resources': []})()
+            async with aclosing(self._rpc("resources/list", {})) as messages:
+                async for data in messages:
+                    result = self._parse_resources_json(data)
+                    if result.resources:
+                        return result
+            logger.warning(f"resources/list returned no resources from {self.base_url}")
         except Exception as e:
             logger.error(f"Failed to list resources from {self.base_url}: {e}")
-            return type('ResourcesResult', (), {'resources': []})()
+        return _ResourcesResult([])
     
     def _parse_resources_json(self, data):
         """Parse resources from JSON response."""
         try:
             if "result" in data and "resources" in data["result"]:
-                from mcp.types import Resource
-                resources = [Resource(
+                resources = [_RpcResource(
                     uri=r["uri"],
                     name=r.get("name", ""),
                     description=r.get("description", ""),
                     mimeType=r.get("mimeType", "text/plain")
                 ) for r in data["result"]["resources"]]
                 logger.info(f"Found {len(resources)} resources from {self.base_url}")
-                return type('ResourcesResult', (), {'resources': resources})()
+                return _ResourcesResult(resources)
         except Exception as e:
             logger.warning(f"Bad resources payload from {self.base_url}: {e}")
-        return type('ResourcesResult', (), {'resources': []})()
+        return _ResourcesResult([])
     
     async def call_tool(self, name: str, arguments: Dict[str, Any]):
         """Call a tool using JSON-RPC with support for both JSON and SSE."""
-        payload = {
-            "jsonrpc": "2.0",
-            "id": 3,
-            "method": "tools/call",
-            "params": {"name": name, "arguments": arguments}
-        }
-        url = self.base_url
-
         try:
-            # First try plain JSON
-            resp = await self.http_client.post(
-                url, json=payload,
-                headers={"Content-Type": "application/json", "Accept": "application/json, text/event-stream"}
+            params = {"name": name, "arguments": arguments}
+            async with aclosing(self._rpc("tools/call", params)) as messages:
+                async for data in messages:
+                    return self._parse_tool_result(data)
+            # No data extracted
+            return _ToolResult(
+                content=[TextContent(type="text", text="No response from tool call")],
+                isError=True,
             )
-            if resp.status_code == 200 and resp.headers.get("content-type","").startswith("application/json"):
-                data = resp.json()
-                return self._parse_tool_result(data)
-
-            # Otherwise fall back to SSE streaming
-            async with self.http_client.stream(
-                "POST", url,
-                json=payload,
-                headers={"Content-Type": "application/json", "Accept": "text/event-stream"}
-            ) as s:
-                buf = ""
-                async for chunk in s.aiter_text():
-                    buf += chunk
-                    for line in buf.splitlines():
-                        if line.startswith("data: "):
-                            json_str = line[6:].strip()
-                            try:
-                                import json as _json
-                                data = _json.loads(json_str)
-                                result = self._parse_tool_result(data)
-                                if result:
-                                    return result
-                            except Exception:
-                                continue
-                # No data extracted
-                from mcp.types import TextContent
-                return type('ToolResult', (), {
-                    'content': [TextContent(type="text", text="No response from tool call")],
-                    'isError': True
-                })()
         except Exception as e:
-            from mcp.types import TextContent
-            return type('ToolResult', (), {
-                'content': [TextContent(type="text", text=f"Error: {str(e)}")],
-                'isError': True
-            })()
+            return _ToolResult(
+                content=[TextContent(type="text", text=f"Error: {str(e)}")],
+                isError=True,
+            )
+    
+    async def call_tools_batch(self, calls: List[Tuple[str, Dict[str, Any]]]):
+        """Call several tools in one JSON-RPC batch request.
+        
+        Replies are matched to calls by id, so servers may answer in any order
+        and as one JSON array or as separate SSE messages. Results are returned
+        in call order. Batching was dropped from MCP in 2025-06-18, so calls
+        left unanswered are retried as concurrent single requests, and a
+        server that answers none of them is not sent batches again.
+        """
+        if not self.batch_supported:
+            return list(await asyncio.gather(*(self.call_tool(name, arguments) for name, arguments in calls)))
+        
+        ids = [next(self._rpc_id) for _ in calls]
+        payload = [
+            {"jsonrpc": "2.0", "id": rpc_id, "method": "tools/call", "params": {"name": name, "arguments": arguments}}
+            for rpc_id, (name, arguments) in zip(ids, calls)
+        ]
+        replies: Dict[Any, Dict[str, Any]] = {}
+        try:
+            async with aclosing(self._post("tools/call batch", payload)) as messages:
+                async for data in messages:
+                    for reply in data if isinstance(data, list) else (data,):
+                        if isinstance(reply, dict):
+                            replies[reply.get("id")] = reply
+                    if all(rpc_id in replies for rpc_id in ids):
+                        break
+        except Exception as e:
+            return [
+                _ToolResult(content=[TextContent(type="text", text=f"Error: {str(e)}")], isError=True)
+                for _ in calls
+            ]
+        
+        unanswered = [i for i, rpc_id in enumerate(ids) if rpc_id not in replies]
+        if len(unanswered) == len(ids):
+            logger.warning(f"{self.base_url} does not answer JSON-RPC batches; sending tool calls singly")
+            self.batch_supported = False
+        
+        retried = await asyncio.gather(*(self.call_tool(*calls[i]) for i in unanswered))
+        results = [self._parse_tool_result(replies[rpc_id]) if rpc_id in replies else None for rpc_id in ids]
+        for i, result in zip(unanswered, retried):
+            results[i] = result
+        return results
     
     def _parse_tool_result(self, data):
         """Parse tool call result from JSON response."""
         try:
             if "result" in data:
-                from mcp.types import TextContent
                 content = []
                 for item in data["result"].get("content", []):
                     if item.get("type") == "text":
                         content.append(TextContent(type="text", text=item["text"]))
-                return type('ToolResult', (), {
-                    'content': content,
-                    'isError': data["result"].get("isError", False)
-                })()
+                return _ToolResult(
+                    content=content,
+                    isError=data["result"].get("isError", False),
+                )
             else:
-                from mcp.types import TextContent
-                return type('ToolResult', (), {
-                    'content': [TextContent(type="text", text=f"Error in response: {data}")],
-                    'isError': True
-                })()
+                return _ToolResult(
+                    content=[TextContent(type="text", text=f"Error in response: {data}")],
+                    isError=True,
+                )
         except Exception as e:
-            from mcp.types import TextContent
-            return type('ToolResult', (), {
-                'content': [TextContent(type="text", text=f"Parse error: {str(e)}")],
-                'isError': True
-            })()
+            return _ToolResult(
+                content=[TextContent(type="text", text=f"Parse error: {str(e)}")],
+                isError=True,
+            )
     
     async def close(self):
-        """Close the session."""
-        await self.http_client.aclose()
+        """Close the session, and the HTTP client unless it is shared."""
+        if self.owns_client:
+            await self.http_client.aclose()
+
+
+class MCPLangChainTool(BaseTool):
+    """LangChain tool that calls an MCP tool through its server session."""
+    
+    args_schema: Optional[Any] = None
+    tool_info: Dict[str, Any]
+    session: Any = None
+    
+    def __init__(self, tool_info: Dict[str, Any], session: ClientSession):
+        super().__init__(
+            name=tool_info["name"],
+            description=tool_info.get("description", ""),
+            tool_info=tool_info,
+            session=session,
+        )
+    
+    def _run(self, **kwargs) -> str:
+        """Synchronous version - not supported for MCP tools."""
+        raise NotImplementedError("MCP tools require async execution")
+    
+    async def _arun(self, **kwargs) -> str:
+        """Asynchronous execution of the MCP tool."""
+        try:
+            result = await self.session.call_tool(self.name, kwargs)
+            if result.isError:
+                return f"Error: {result.content[0].text if result.content else 'Unknown error'}"
+            else:
+                return result.content[0].text if result.content else "No output"
+        except Exception as e:
+            return f"Error calling tool {self.name}: {str(e)}"
 
 
 def convert_mcp_tool_to_langchain(tool_info: Dict[str, Any], session: ClientSession) -> Any:
     """Convert MCP tool to LangChain tool."""
-    from langchain_core.tools import BaseTool
-    from typing import Dict, Any
-    
-    class MCPLangChainTool(BaseTool):
-        name: str = tool_info["name"]
-        description: str = tool_info.get("description", "")
-        args_schema: Optional[Any] = None
-        
-        def __init__(self, tool_info: Dict[str, Any], session: ClientSession):
-            super().__init__()
-            self.tool_info = tool_info
-            self.session = session
-            self.name = tool_info["name"]
-            self.description = tool_info.get("description", "")
-        
-        def _run(self, **kwargs) -> str:
-            """Synchronous version - not supported for MCP tools."""
-            raise NotImplementedError("MCP tools require async execution")
-        
-        async def _arun(self, **kwargs) -> str:
-            """Asynchronous execution of the MCP tool."""
-            try:
-                result = await self.session.call_tool(self.name, kwargs)
-                if result.isError:
-                    return f"Error: {result.content[0].text if result.content else 'Unknown error'}"
-                else:
-                    return result.content[0].text if result.content else "No output"
-            except Exception as e:
-                return f"Error calling tool {self.name}: {str(e)}"
-    
     return MCPLangChainTool(tool_info, session)
 
 
 class MCPServerConnection:
     """Represents a connection to a single MCP server."""
     
-    def __init__(self, config: MCPServerConfig):
+    def __init__(self, config: MCPServerConfig, http_client: Optional[httpx.AsyncClient] = None):
         self.config = config
+        # Pool shared with other servers (owned by MCPManager); None gives this connection its own
+        self.shared_http_client = http_client
         self.session: Optional[ClientSession] = None
         self.tools: List[Dict[str, Any]] = []
         self.resources: List[Dict[str, Any]] = []
         self.connected = False
         self.last_error: Optional[str] = None
+        self.http_client: Optional[httpx.AsyncClient] = None
+        # Auth token is looked up once and reused on every reconnect
+        self.token = os.environ.get(config.token_env) if config.token_env else None
+        # HTTP headers: config.headers plus Authorization, built once for every reconnect
+        self._http_headers = dict(config.headers or {})
+        if self.token:
+            self._http_headers.setdefault("Authorization", f"Bearer {self.token}")
+    
+    async def __aenter__(self) -> "MCPServerConnection":
+        await self.connect()
+        return self
+    
+    async def __aexit__(self, *exc_info) -> None:
+        await self.disconnect()
     
     async def connect(self) -> bool:
         """Connect to the MCP server."""
@@ -359,16 +454,13 @@ class MCPServerConnection:
             raise ValueError("stdio transport requires cmd configuration")
         
         # Get authentication token if needed
-        token = None
-        if self.config.token_env:
-            token = os.getenv(self.config.token_env)
-            if not token:
-                logger.warning(f"No token found for {self.config.name} in {self.config.token_env}")
+        if self.config.token_env and not self.token:
+            logger.warning(f"No token found for {self.config.name} in {self.config.token_env}")
         
         # Prepare command with token if available
         cmd = self.config.cmd.copy()
-        if token:
-            cmd.extend(["--token", token])
+        if self.token:
+            cmd.extend(["--token", self.token])
         
         # Create stdio server parameters
         server_params = StdioServerParameters(
@@ -390,27 +482,27 @@ class MCPServerConnection:
         if not self.config.url:
             raise ValueError("HTTP transport requires url configuration")
         
-        # Объединяем config.headers и Authorization
-        headers = dict(getattr(self.config, 'headers', {}) or {})
+        if self.config.token_env and not self.token:
+            logger.warning(f"No token found for {self.config.name} in {self.config.token_env}")
         
-        # Get authentication token if needed
-        if self.config.token_env:
-            token = os.getenv(self.config.token_env)
-            if token:
-                headers.setdefault("Authorization", f"Bearer {token}")
-            else:
-                logger.warning(f"No token found for {self.config.name} in {self.config.token_env}")
-        
-        # Create HTTP client using official MCP library
-        http_client = create_mcp_http_client(headers=headers)
+        # One pooled client serves every request for the connection's lifetime
+        owns_client = self.shared_http_client is None
+        self.http_client = _new_http_client() if owns_client else self.shared_http_client
         
         # Skip health check - go directly to tools/list
         logger.info(f"Connecting to HTTP MCP server: {self.config.name}")
         
         # For now, we'll create a mock session that implements the MCP interface
         # In a real implementation, you'd need to implement the full MCP protocol over HTTP
-        self.session = MockHTTPSession(str(self.config.url), http_client)
-        await self.session.initialize()  # <<< important
+        self.session = MockHTTPSession(
+            str(self.config.url),
+            self.http_client,
+            headers=self._http_headers,
+            timeout=self.config.timeout,
+            owns_client=owns_client,
+        )
+        # initialize and both listings in one round trip; capabilities come from the preload
+        await self.session.warmup()
         await self._list_capabilities()
     
     async def _connect_sse(self):
@@ -424,25 +516,30 @@ class MCPServerConnection:
         if not self.session:
             return
         
-        try:
-            # List tools
-            tools_result = await self.session.list_tools()
-            self.tools = tools_result.tools
-            
-            # List resources
-            resources_result = await self.session.list_resources()
+        # Tools and resources are independent, so fetch them concurrently
+        tools_result, resources_result = await asyncio.gather(
+            self.session.list_tools(),
+            self.session.list_resources(),
+            return_exceptions=True,
+        )
+        
+        if isinstance(resources_result, Exception):
+            logger.error(f"Failed to list resources for {self.config.name}: {resources_result}")
+        else:
             self.resources = resources_result.resources
-            
-            if len(self.tools) == 0:
-                self.connected = False
-                self.last_error = "no tools"
-                logger.warning(f"MCP server {self.config.name} connected but exposes 0 tools; marking unusable")
-            else:
-                self.connected = True
-                logger.info(f"MCP server {self.config.name} usable: {len(self.tools)} tools")
-            
-        except Exception as e:
-            logger.error(f"Failed to list capabilities for {self.config.name}: {e}")
+        
+        if isinstance(tools_result, Exception):
+            logger.error(f"Failed to list tools for {self.config.name}: {tools_result}")
+            return
+        
+        self.tools = tools_result.tools
+        if len(self.tools) == 0:
+            self.connected = False
+            self.last_error = "no tools"
+            logger.warning(f"MCP server {self.config.name} connected but exposes 0 tools; marking unusable")
+        else:
+            self.connected = True
+            logger.info(f"MCP server {self.config.name} usable: {len(self.tools)} tools")
     
     async def call_tool(self, tool_name: str, arguments: Dict[str, Any]) -> Dict[str, Any]:
         """Call a tool on this MCP server."""
@@ -462,6 +559,31 @@ class MCPServerConnection:
                 "is_error": True,
             }
     
+    async def call_tools(self, calls: List[Tuple[str, Dict[str, Any]]]) -> List[Dict[str, Any]]:
+        """Call several tools on this MCP server, in one batch request over HTTP.
+        
+        Sessions without batch support get the calls concurrently instead.
+        Results are returned in call order.
+        """
+        if not self.session:
+            raise Exception(f"No active session for {self.config.name}")
+        
+        batch = getattr(self.session, "call_tools_batch", None)
+        if batch is None:
+            return list(await asyncio.gather(
+                *(self.call_tool(name, arguments) for name, arguments in calls)
+            ))
+        
+        try:
+            results = await batch(calls)
+        except Exception as e:
+            logger.error(f"Batch tool call failed on {self.config.name}: {e}")
+            return [
+                {"content": [{"type": "text", "text": f"Error: {str(e)}"}], "is_error": True}
+                for _ in calls
+            ]
+        return [{"content": result.content, "is_error": result.isError} for result in results]
+    
     async def disconnect(self):
         """Disconnect from the MCP server."""
         if self.session:
@@ -471,6 +593,7 @@ class MCPServerConnection:
                 logger.error(f"Error disconnecting from {self.config.name}: {e}")
             finally:
                 self.session = None
+                self.http_client = None
                 self.connected = False
 
 
@@ -483,6 +606,13 @@ class MCPManager:
         self.connected_servers: List[str] = []
         self.all_tools: List[Dict[str, Any]] = []
         self.all_resources: List[Dict[str, Any]] = []
+        # Tool name -> highest-priority tool entry, rebuilt with all_tools
+        self._tool_index: Dict[str, Dict[str, Any]] = {}
+        # Read-only snapshots handed out by get_available_*, rebuilt with all_tools
+        self._tools_view: Tuple[Dict[str, Any], ...] = ()
+        self._resources_view: Tuple[Dict[str, Any], ...] = ()
+        # HTTP/2 pool shared by every HTTP server, created with the first one
+        self._http_client: Optional[httpx.AsyncClient] = None
     
     async def initialize(self) -> bool:
         """Initialize all MCP servers."""
@@ -490,36 +620,37 @@ class MCPManager:
             logger.info("MCP functionality is disabled")
             return False
         
-        logger.info(f"Initializing {len(self.config.servers)} MCP servers...")
+        enabled_servers = self.config.enabled_servers
+        skipped = len(self.config.servers) - len(enabled_servers)
+        logger.info(f"Initializing {len(enabled_servers)} MCP servers ({skipped} disabled)...")
         
-        # Create server connections
-        for server_config in self.config.servers:
-            if not server_config.enabled:
-                logger.info(f"Skipping disabled server: {server_config.name}")
-                continue
-            
-            connection = MCPServerConnection(server_config)
-            self.servers[server_config.name] = connection
+        # Create server connections, highest priority first
+        for server_config in enabled_servers:
+            if server_config.transport == "http" and self._http_client is None:
+                self._http_client = _new_http_client()
+            self.servers[server_config.name] = MCPServerConnection(server_config, http_client=self._http_client)
         
-        # Connect to all servers in parallel
-        connection_tasks = []
-        for name, connection in self.servers.items():
-            task = asyncio.create_task(self._connect_server(name, connection))
-            connection_tasks.append(task)
+        # Connect to servers in parallel, a bounded number at a time
+        semaphore = asyncio.Semaphore(_MAX_CONCURRENT_CONNECTS)
         
-        # Wait for all connections
-        results = await asyncio.gather(*connection_tasks, return_exceptions=True)
+        async def connect(name: str, connection: MCPServerConnection):
+            async with semaphore:
+                return name, await self._connect_server(name, connection)
         
-        # Process results
+        # Record each server as soon as its connection attempt finishes
         successful_connections = 0
-        for i, result in enumerate(results):
-            server_name = list(self.servers.keys())[i]
-            if isinstance(result, Exception):
-                logger.error(f"Connection to {server_name} failed: {result}")
-            elif result and self.servers[server_name].connected:
+        for next_result in asyncio.as_completed(
+            [connect(name, connection) for name, connection in self.servers.items()]
+        ):
+            server_name, result = await next_result
+            if result and self.servers[server_name].connected:
                 self.connected_servers.append(server_name)
                 successful_connections += 1
         
+        # Restore priority order so tools are collected highest priority first
+        order = {name: i for i, name in enumerate(self.servers)}
+        self.connected_servers.sort(key=order.__getitem__)
+        
         # Collect all tools and resources
         await self._collect_capabilities()
         
@@ -552,23 +683,35 @@ class MCPManager:
         for server_name in self.connected_servers:
             connection = self.servers[server_name]
             
-            # Add tools with server prefix
+            # Add tools with server info; only the fields callers read are copied
             for tool in connection.tools:
-                # Convert Tool object to dict and add server info
-                tool_dict = tool.model_dump() if hasattr(tool, 'model_dump') else tool.__dict__
-                tool_dict["server"] = server_name
-                tool_dict["priority"] = connection.config.priority
-                self.all_tools.append(tool_dict)
+                self.all_tools.append({
+                    "name": tool.name,
+                    "description": tool.description,
+                    "inputSchema": tool.inputSchema,
+                    "meta": getattr(tool, "meta", None),
+                    "server": server_name,
+                    "priority": connection.config.priority,
+                })
             
-            # Add resources with server prefix
+            # Add resources with server info
             for resource in connection.resources:
-                # Convert Resource object to dict and add server info
-                resource_dict = resource.model_dump() if hasattr(resource, 'model_dump') else resource.__dict__
-                resource_dict["server"] = server_name
-                self.all_resources.append(resource_dict)
+                self.all_resources.append({
+                    "uri": resource.uri,
+                    "name": resource.name,
+                    "description": resource.description,
+                    "mimeType": resource.mimeType,
+                    "server": server_name,
+                })
+        
+        # Servers are visited in priority order, so all_tools is already sorted
+        # and the first entry per name is the highest-priority one
+        self._tool_index = {}
+        for tool in self.all_tools:
+            self._tool_index.setdefault(tool["name"], tool)
         
-        # Sort tools by priority (higher priority first)
-        self.all_tools.sort(key=lambda x: x.get("priority", 0), reverse=True)
+        self._tools_view = tuple(self.all_tools)
+        self._resources_view = tuple(self.all_resources)
     
     async def call_tool(self, tool_name: str, arguments: Dict[str, Any], server: Optional[str] = None) -> Dict[str, Any]:
         """Call a tool by name, finding the appropriate server."""
@@ -580,11 +723,7 @@ class MCPManager:
             return await connection.call_tool(tool_name, arguments)
         
         # Старое поведение (по имени/приоритету), если server не указан
-        tool_info = None
-        for tool in self.all_tools:
-            if tool["name"] == tool_name:
-                tool_info = tool
-                break
+        tool_info = self._tool_index.get(tool_name)
         
         if not tool_info:
             raise ValueError(f"Tool '{tool_name}' not found")
@@ -596,13 +735,42 @@ class MCPManager:
         connection = self.servers[server_name]
         return await connection.call_tool(tool_name, arguments)
     
-    def get_available_tools(self) -> List[Dict[str, Any]]:
-        """Get list of all available tools."""
-        return self.all_tools.copy()
+    async def call_tools(self, calls: List[Tuple[str, Dict[str, Any], Optional[str]]]) -> List[Dict[str, Any]]:
+        """Call several tools, sending one batch request per server.
+        
+        Each call is (tool_name, arguments, server); a server of None picks the
+        highest-priority server exposing the tool, as in call_tool. Results are
+        returned in call order.
+        """
+        # Server name -> [(position in calls, tool name, arguments)]
+        groups: Dict[str, List[Tuple[int, str, Dict[str, Any]]]] = {}
+        for position, (tool_name, arguments, server) in enumerate(calls):
+            if not server:
+                tool_info = self._tool_index.get(tool_name)
+                if not tool_info:
+                    raise ValueError(f"Tool '{tool_name}' not found")
+                server = tool_info["server"]
+            if server not in self.connected_servers:
+                raise Exception(f"Server '{server}' is not connected")
+            groups.setdefault(server, []).append((position, tool_name, arguments))
+        
+        async def run(server: str, group: List[Tuple[int, str, Dict[str, Any]]]):
+            results = await self.servers[server].call_tools([(name, arguments) for _, name, arguments in group])
+            return zip((position for position, _, _ in group), results)
+        
+        ordered: List[Optional[Dict[str, Any]]] = [None] * len(calls)
+        for pairs in await asyncio.gather(*(run(server, group) for server, group in groups.items())):
+            for position, result in pairs:
+                ordered[position] = result
+        return ordered
+    
+    def get_available_tools(self) -> Tuple[Dict[str, Any], ...]:
+        """Get all available tools as a read-only snapshot."""
+        return self._tools_view
     
-    def get_available_resources(self) -> List[Dict[str, Any]]:
-        """Get list of all available resources."""
-        return self.all_resources.copy()
+    def get_available_resources(self) -> Tuple[Dict[str, Any], ...]:
+        """Get all available resources as a read-only snapshot."""
+        return self._resources_view
     
     def get_langchain_tools(self) -> List[Any]:
         """Get all MCP tools converted to LangChain tools."""
@@ -636,9 +804,16 @@ class MCPManager:
         if disconnect_tasks:
             await asyncio.gather(*disconnect_tasks, return_exceptions=True)
         
+        if self._http_client is not None:
+            await self._http_client.aclose()
+            self._http_client = None
+        
         self.connected_servers.clear()
         self.all_tools.clear()
         self.all_resources.clear()
+        self._tool_index.clear()
+        self._tools_view = ()
+        self._resources_view = ()
         
         logger.info("MCP shutdown complete")
 
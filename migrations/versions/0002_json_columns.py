@@ -0,0 +1,55 @@
+"""Store payload and metrics as JSON
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2025-01-15 00:00:00.000000
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # SQLite keeps JSON as TEXT, so only Postgres needs the columns converted
+    if op.get_bind().dialect.name != "postgresql":
+        return
+
+    op.alter_column(
+        "jobs",
+        "payload_json",
+        type_=postgresql.JSONB(),
+        postgresql_using="payload_json::jsonb",
+    )
+    op.alter_column(
+        "jobs",
+        "metrics_json",
+        type_=postgresql.JSONB(),
+        postgresql_using="metrics_json::jsonb",
+    )
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name != "postgresql":
+        return
+
+    op.alter_column(
+        "jobs",
+        "metrics_json",
+        type_=sa.Text(),
+        postgresql_using="metrics_json::text",
+    )
+    op.alter_column(
+        "jobs",
+        "payload_json",
+        type_=sa.Text(),
+        postgresql_using="payload_json::text",
+    )
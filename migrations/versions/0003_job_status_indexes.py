@@ -0,0 +1,26 @@
+"""Add composite job status indexes
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2025-01-20 00:00:00.000000
+
+"""
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index("ix_jobs_status_queued_at", "jobs", ["status", "queued_at"])
+    op.create_index("ix_jobs_status_started_at", "jobs", ["status", "started_at"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_jobs_status_started_at", table_name="jobs")
+    op.drop_index("ix_jobs_status_queued_at", table_name="jobs")
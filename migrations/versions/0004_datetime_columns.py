@@ -0,0 +1,88 @@
+"""Store job timestamps as native datetimes
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2025-01-22 00:00:00.000000
+
+"""
+
+from datetime import datetime, timezone
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+TIMESTAMP_COLUMNS = ("queued_at", "started_at", "finished_at")
+
+
+def _to_storage(value):
+    """Convert an ISO8601 string to SQLite's naive UTC datetime text."""
+    parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed.strftime("%Y-%m-%d %H:%M:%S.%f")
+
+
+def _to_iso(value):
+    """Convert SQLite's naive UTC datetime text back to ISO8601."""
+    parsed = datetime.fromisoformat(value)
+    return parsed.replace(tzinfo=timezone.utc).isoformat()
+
+
+def _rewrite_sqlite_timestamps(convert) -> None:
+    # SQLite compares the stored text, so every value must share one format
+    conn = op.get_bind()
+    columns = ", ".join(TIMESTAMP_COLUMNS)
+    rows = conn.execute(sa.text(f"SELECT job_id, {columns} FROM jobs")).mappings()
+    params = [
+        {
+            "job_id": row["job_id"],
+            **{
+                column: convert(row[column]) if row[column] else None
+                for column in TIMESTAMP_COLUMNS
+            },
+        }
+        for row in rows
+    ]
+    if params:
+        assignments = ", ".join(f"{column} = :{column}" for column in TIMESTAMP_COLUMNS)
+        conn.execute(
+            sa.text(f"UPDATE jobs SET {assignments} WHERE job_id = :job_id"), params
+        )
+
+
+def upgrade() -> None:
+    if op.get_bind().dialect.name == "sqlite":
+        _rewrite_sqlite_timestamps(_to_storage)
+        return
+
+    for column in TIMESTAMP_COLUMNS:
+        op.alter_column(
+            "jobs",
+            column,
+            type_=sa.DateTime(timezone=True),
+            postgresql_using=f"{column}::timestamptz",
+        )
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name == "sqlite":
+        _rewrite_sqlite_timestamps(_to_iso)
+        return
+
+    for column in TIMESTAMP_COLUMNS:
+        op.alter_column(
+            "jobs",
+            column,
+            type_=sa.String(length=50),
+            postgresql_using=(
+                f"to_char({column} AT TIME ZONE 'UTC', "
+                "'YYYY-MM-DD\"T\"HH24:MI:SS.US\"+00:00\"')"
+            ),
+        )
@@ -1,10 +1,48 @@
 """SQLAlchemy models for the audit agent."""
 
-from sqlalchemy import Column, Integer, String, Text, Index
+from datetime import datetime, timezone
+
+from sqlalchemy import JSON, Column, DateTime, Integer, String, Text, Index
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import declarative_base
+from sqlalchemy.types import TypeDecorator
 
 Base = declarative_base()
 
+# Native JSONB on Postgres, JSON-encoded TEXT elsewhere
+JSONType = JSON().with_variant(JSONB(), "postgresql")
+
+
+class UTCDateTime(TypeDecorator):
+    """Native datetime column exposed as a UTC ISO8601 string.
+
+    Values are stored as real timestamps so comparisons and index range scans
+    run on datetimes, while the model keeps the string form used by the API.
+    """
+
+    impl = DateTime(timezone=True)
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        if isinstance(value, str):
+            value = datetime.fromisoformat(value.replace("Z", "+00:00"))
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        value = value.astimezone(timezone.utc)
+        # SQLite stores naive text; keep every stored value in UTC
+        if dialect.name == "sqlite":
+            value = value.replace(tzinfo=None)
+        return value
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        return value.astimezone(timezone.utc).isoformat()
+
 
 class Job(Base):
     """Job model for storing audit job information."""
@@ -15,17 +53,17 @@ class Job(Base):
     status = Column(
         String(20), nullable=False, index=True
     )  # queued, running, succeeded, failed, canceled, expired
-    queued_at = Column(String(50), nullable=False)  # UTC ISO8601
-    started_at = Column(String(50), nullable=True)  # UTC ISO8601
-    finished_at = Column(String(50), nullable=True)  # UTC ISO8601
+    queued_at = Column(UTCDateTime, nullable=False)  # UTC ISO8601
+    started_at = Column(UTCDateTime, nullable=True)  # UTC ISO8601
+    finished_at = Column(UTCDateTime, nullable=True)  # UTC ISO8601
     progress_phase = Column(
         String(20), nullable=False, default="preflight"
     )  # preflight, fetch, analysis, llm, reporting, final
     progress_percent = Column(Integer, nullable=False, default=0)
     error_message = Column(Text, nullable=True)
-    metrics_json = Column(Text, nullable=True)  # JSON string with metrics
+    metrics_json = Column(JSONType, nullable=True)  # Metrics dict
     report_path = Column(String(500), nullable=True)
-    payload_json = Column(Text, nullable=False)  # Original request JSON
+    payload_json = Column(JSONType, nullable=False)  # Original request
     idempotency_key = Column(String(255), nullable=True, unique=True, index=True)
     worker_id = Column(String(50), nullable=True)
 
@@ -34,6 +72,9 @@ class Job(Base):
         Index("idx_jobs_status", "status"),
         Index("idx_jobs_queued_at", "queued_at"),
         Index("idx_jobs_idempotency", "idempotency_key"),
+        # Composite indexes for the queue scan and the stale-job sweep
+        Index("ix_jobs_status_queued_at", "status", "queued_at"),
+        Index("ix_jobs_status_started_at", "status", "started_at"),
     )
 
     def to_dict(self) -> dict:
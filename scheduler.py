@@ -5,7 +5,12 @@ import time
 
 from loguru import logger
 
-from db import SessionLocal, JobRepository
+from db import (
+    AsyncJobRepository,
+    AsyncSessionLocal,
+    JobRepository,
+    SessionLocal,
+)
 from models import Job
 from settings import settings
 from utils import get_current_timestamp
@@ -59,10 +64,10 @@ class JobScheduler:
 
     async def _expire_stale_jobs(self):
         """Expire stale running jobs."""
-        db = SessionLocal()
         try:
-            repo = JobRepository(db)
-            expired_count = repo.expire_stale_jobs(self.job_timeout)
+            async with AsyncSessionLocal() as db:
+                repo = AsyncJobRepository(db)
+                expired_count = await repo.expire_stale_jobs(self.job_timeout)
 
             if expired_count > 0:
                 logger.warning(f"Expired {expired_count} stale jobs")
@@ -70,65 +75,33 @@ class JobScheduler:
             self.last_heartbeat = time.time()
         except Exception as e:
             logger.error(f"Error expiring stale jobs: {e}")
-        finally:
-            db.close()
 
     async def _dispatch_jobs(self):
         """Dispatch queued jobs to available workers."""
-        db = SessionLocal()
         try:
-            repo = JobRepository(db)
+            async with AsyncSessionLocal() as db:
+                repo = AsyncJobRepository(db)
 
-            # Get queued jobs
-            queued_jobs = repo.get_queued_jobs(limit=self.worker_pool_size)
-
-            # Get running jobs count
-            running_jobs = repo.get_running_jobs()
-            available_workers = self.worker_pool_size - len(running_jobs)
-
-            if available_workers <= 0:
-                return
-
-            # Dispatch jobs to available workers
-            for job in queued_jobs[:available_workers]:
-                await self._assign_job_to_worker(job, repo)
-
-        except Exception as e:
-            logger.error(f"Error dispatching jobs: {e}")
-        finally:
-            db.close()
+                # Get running jobs count
+                available_workers = (
+                    self.worker_pool_size - await repo.count_running_jobs()
+                )
 
-    async def _assign_job_to_worker(self, job: Job, repo: JobRepository):
-        """Assign a job to a worker."""
-        try:
-            # Generate worker ID
-            worker_id = f"worker-{int(time.time() * 1000)}"
+                if available_workers <= 0:
+                    return
 
-            # Update job status atomically
-            updated_job = repo.update_job_status(
-                job.job_id,
-                "running",
-                started_at=get_current_timestamp(),
-                worker_id=worker_id,
-            )
+                # Claim the oldest queued jobs for the available workers at once
+                worker_prefix = f"worker-{int(time.time() * 1000)}"
+                jobs = await repo.claim_queued_jobs(available_workers, worker_prefix)
 
-            if updated_job:
-                logger.info(f"Assigned job {job.job_id} to worker {worker_id}")
+            for job in jobs:
+                logger.info(f"Assigned job {job.job_id} to worker {job.worker_id}")
 
                 # Start worker task
-                asyncio.create_task(self._run_job_worker(updated_job, worker_id))
-            else:
-                logger.warning(f"Failed to assign job {job.job_id} to worker")
+                asyncio.create_task(self._run_job_worker(job, job.worker_id))
 
         except Exception as e:
-            logger.error(f"Error assigning job {job.job_id}: {e}")
-            # Mark job as failed
-            repo.update_job_status(
-                job.job_id,
-                "failed",
-                error_message=f"Failed to assign to worker: {str(e)}",
-                finished_at=get_current_timestamp(),
-            )
+            logger.error(f"Error dispatching jobs: {e}")
 
     async def _run_job_worker(self, job: Job, worker_id: str):
         """Run a job worker."""
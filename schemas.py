@@ -1,6 +1,6 @@
 """Pydantic schemas for request/response validation."""
 
-from typing import Optional
+from typing import Dict, List, Optional
 
 from pydantic import BaseModel, Field, HttpUrl
 
@@ -85,6 +85,25 @@ class JobStatusResponse(BaseModel):
     links: JobLinks = Field(..., description="Job links")
 
 
+class JobStatusManyRequest(BaseModel):
+    """Request schema for a batched job status lookup."""
+
+    job_ids: List[str] = Field(
+        ..., min_length=1, max_length=200, description="Job identifiers to look up"
+    )
+
+
+class JobStatusManyResponse(BaseModel):
+    """Response schema for a batched job status lookup."""
+
+    jobs: Dict[str, JobStatusResponse] = Field(
+        ..., description="Status of each found job, keyed by job ID"
+    )
+    missing: List[str] = Field(
+        default_factory=list, description="Requested job IDs that do not exist"
+    )
+
+
 class HealthResponse(BaseModel):
     """Health check response."""
 
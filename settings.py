@@ -21,6 +21,12 @@ class Settings(BaseSettings):
     # Data storage
     data_dir: str = Field(default="/app/data", description="Data directory for reports")
 
+    # Agent checkpoints (empty keeps them in memory)
+    checkpoint_db_path: str = Field(
+        default="/app/state/checkpoints.db",
+        description="SQLite file for persisted agent checkpoints",
+    )
+
     # Worker settings
     worker_pool_size: int = Field(default=4, description="Number of worker processes")
     job_hard_timeout_sec: int = Field(
@@ -38,6 +44,25 @@ class Settings(BaseSettings):
         default="https://openrouter.ai/api/v1", description="OpenRouter base URL"
     )
 
+    # LLM HTTP connection pool
+    llm_max_connections: int = Field(
+        default=200, description="Maximum pooled connections for LLM calls"
+    )
+    llm_max_keepalive: int = Field(
+        default=50, description="Maximum keep-alive connections for LLM calls"
+    )
+    llm_keepalive_expiry_sec: float = Field(
+        default=30.0, description="Idle time before a pooled LLM connection closes"
+    )
+    max_concurrent_llm_calls: int = Field(
+        default=16, description="Maximum concurrent outbound LLM calls per process"
+    )
+
+    # MCP tool calls
+    mcp_max_concurrent_per_server: int = Field(
+        default=8, description="Maximum concurrent tool calls per MCP server"
+    )
+
     # Logging
     log_level: str = Field(default="info", description="Log level")
 
@@ -45,6 +70,9 @@ class Settings(BaseSettings):
     dry_run: bool = Field(
         default=True, description="Enable dry run mode when no API key"
     )
+    dry_run_simulated_delay: float = Field(
+        default=0.0, description="Seconds each DRY_RUN report waits to mimic an LLM"
+    )
 
     # Application version
     version: str = Field(default="1.0.0", description="Application version")
@@ -3,7 +3,9 @@
 import pytest
 from fastapi.testclient import TestClient
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
 
 from db import Base
 from models import Job
@@ -63,7 +65,7 @@ def test_db_session(test_engine):
 
 
 @pytest.fixture(scope="function")
-def test_client(test_db_session, test_engine):
+def test_client(test_db_session, test_engine, test_db_url):
     """Create test client with database override."""
     from fastapi import FastAPI
     from app import app as original_app
@@ -72,9 +74,20 @@ def test_client(test_db_session, test_engine):
     # Override the global engine and session factory for tests
     original_engine = db.engine
     original_session_local = db.SessionLocal
+    original_async_session_local = db.AsyncSessionLocal
 
     db.engine = test_engine
-    db.SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=test_engine)
+    db.SessionLocal = sessionmaker(
+        autocommit=False, autoflush=False, expire_on_commit=False, bind=test_engine
+    )
+
+    # NullPool keeps no aiosqlite connections bound to the TestClient's loop
+    test_async_engine = create_async_engine(
+        db.to_async_url(test_db_url), poolclass=NullPool
+    )
+    db.AsyncSessionLocal = async_sessionmaker(
+        test_async_engine, autoflush=False, expire_on_commit=False
+    )
 
     # Ensure tables are created in the test engine
     Base.metadata.create_all(bind=test_engine)
@@ -90,7 +103,7 @@ def test_client(test_db_session, test_engine):
     for route in original_app.routes:
         test_app.routes.append(route)
 
-    # Don't override get_db - let it use the overridden SessionLocal
+    # Don't override get_db - let it use the overridden AsyncSessionLocal
 
     try:
         with TestClient(test_app) as client:
@@ -99,6 +112,7 @@ def test_client(test_db_session, test_engine):
         # Restore original engine and session factory
         db.engine = original_engine
         db.SessionLocal = original_session_local
+        db.AsyncSessionLocal = original_async_session_local
 
 
 @pytest.fixture
@@ -124,7 +138,6 @@ def sample_job_payload():
 @pytest.fixture
 def sample_job(test_db_session, sample_job_payload):
     """Create sample job in database."""
-    import json
     from utils import get_current_timestamp
 
     job = Job(
@@ -133,7 +146,7 @@ def sample_job(test_db_session, sample_job_payload):
         queued_at=get_current_timestamp(),
         progress_phase="preflight",
         progress_percent=0,
-        payload_json=json.dumps(sample_job_payload),
+        payload_json=sample_job_payload,
         idempotency_key="test-123",
     )
 
@@ -0,0 +1,278 @@
+"""Test audit agent nodes."""
+
+import httpx
+import orjson
+import pytest
+from unittest.mock import AsyncMock, patch
+
+from langchain_core.messages import AIMessage, AIMessageChunk, HumanMessage, SystemMessage, ToolMessage
+
+from agent import AuditAgent
+from mcp_config import AgentConfig
+
+
+def make_agent(**agent_config):
+    """Build an agent without an LLM client or tools; tests stub what they need."""
+    agent = AuditAgent.__new__(AuditAgent)
+    agent.agent_config = AgentConfig(**agent_config)
+    agent.tools = []
+    agent.prompt_caching = False
+    agent._system_message_cache = {}
+    agent.llm = AsyncMock()
+    agent.llm.ainvoke.return_value = AIMessage(content="summary")
+    return agent
+
+
+def make_state(messages, **overrides):
+    """Agent state for a job whose history is the given messages."""
+    state = {
+        "messages": messages,
+        "audit_code": "contract C {}",
+        "audit_profile": "generic_audit",
+        "job_id": "job-1",
+        "iteration": 0,
+        "max_iterations": 10,
+        "tools_used": set(),
+        "final_report": None,
+        "done": False,
+        "error": None,
+        "context_summary": None,
+        "summarized_count": 0,
+    }
+    state.update(overrides)
+    return state
+
+
+def tool_turn(index, text="ok"):
+    """An assistant tool call and its result."""
+    call_id = f"call-{index}"
+    return [
+        AIMessage(content="", tool_calls=[{"name": "scan", "args": {}, "id": call_id}]),
+        ToolMessage(content=text, tool_call_id=call_id),
+    ]
+
+
+def history(turns, text="ok"):
+    """The audit request followed by the given number of tool turns."""
+    messages = [HumanMessage(content="Audit this contract")]
+    for index in range(turns):
+        messages += tool_turn(index, text)
+    return messages
+
+
+class TestWindowedMessages:
+    """Test context windowing and running summaries."""
+
+    @pytest.mark.asyncio
+    async def test_short_history_is_sent_unchanged(self):
+        """Test that a history within the window is sent as is."""
+        agent = make_agent(window_size=4)
+        messages = history(2)
+
+        windowed, update = await agent._windowed_messages(make_state(messages))
+
+        assert windowed == messages
+        assert update == {}
+        agent.llm.ainvoke.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_window_keeps_request_and_recent_messages(self):
+        """Test that messages below the budget are kept and nothing is summarized."""
+        agent = make_agent(window_size=4, summary_token_budget=10_000)
+        messages = history(4)
+
+        windowed, update = await agent._windowed_messages(make_state(messages))
+
+        assert windowed == messages
+        assert update == {}
+        agent.llm.ainvoke.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_window_never_starts_on_tool_message(self):
+        """Test that the window is widened to include the tool call of a leading result."""
+        agent = make_agent(window_size=3, summary_token_budget=0)
+        messages = history(4, text="x " * 50)
+        state = make_state(messages)
+
+        windowed, update = await agent._windowed_messages(state)
+
+        # A window of 3 would start on a tool result; it starts one earlier instead
+        assert update == {"context_summary": "summary", "summarized_count": 4}
+        assert windowed[1] == messages[0]
+        assert isinstance(windowed[2], AIMessage)
+        assert windowed[2:] == messages[5:]
+
+    @pytest.mark.asyncio
+    async def test_summarizes_when_budget_exceeded(self):
+        """Test that older messages beyond the budget are replaced by a summary."""
+        agent = make_agent(window_size=4, summary_token_budget=20)
+        messages = history(5, text="finding " * 50)
+        state = make_state(messages)
+
+        windowed, update = await agent._windowed_messages(state)
+
+        assert update == {"context_summary": "summary", "summarized_count": 6}
+        assert isinstance(windowed[0], SystemMessage)
+        assert windowed[0].content.endswith("summary")
+        assert windowed[1:] == [messages[0]] + messages[7:]
+        agent.llm.ainvoke.assert_awaited_once()
+
+        # The state itself is left to the graph to update
+        assert state["context_summary"] is None
+        assert state["summarized_count"] == 0
+
+    @pytest.mark.asyncio
+    async def test_reuses_summary_on_later_turns(self):
+        """Test that a stored summary is sent again without summarizing anew."""
+        agent = make_agent(window_size=4, summary_token_budget=10_000)
+        messages = history(6)
+        state = make_state(messages, context_summary="earlier findings", summarized_count=6)
+
+        windowed, update = await agent._windowed_messages(state)
+
+        assert update == {}
+        assert windowed[0].content.endswith("earlier findings")
+        # Messages after the summarized ones stay verbatim, even outside the window
+        assert windowed[1:] == [messages[0]] + messages[7:]
+        agent.llm.ainvoke.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_new_summary_extends_previous_one(self):
+        """Test that summarizing again includes the previous summary in the prompt."""
+        agent = make_agent(window_size=2, summary_token_budget=20)
+        messages = history(6, text="finding " * 50)
+        state = make_state(messages, context_summary="earlier findings", summarized_count=4)
+
+        windowed, update = await agent._windowed_messages(state)
+
+        assert update == {"context_summary": "summary", "summarized_count": 10}
+        prompt = agent.llm.ainvoke.await_args.args[0][1].content
+        assert prompt.startswith("Earlier summary:\nearlier findings")
+        assert windowed[1:] == [messages[0]] + messages[11:]
+
+
+class TestAgentNode:
+    """Test the tool-calling agent node."""
+
+    @pytest.mark.asyncio
+    async def test_returns_summary_update(self):
+        """Test that a new summary is returned as a state update."""
+        agent = make_agent(window_size=4, summary_token_budget=20)
+        agent.llm_with_tools = AsyncMock()
+        agent.llm_with_tools.ainvoke.return_value = AIMessage(content="report")
+        state = make_state(history(5, text="finding " * 50))
+
+        update = await agent._agent_node(state)
+
+        assert update["context_summary"] == "summary"
+        assert update["summarized_count"] == 6
+        assert update["final_report"] == "report"
+        assert update["done"] is True
+        assert state["summarized_count"] == 0
+
+    @pytest.mark.asyncio
+    async def test_no_summary_keys_without_new_summary(self):
+        """Test that summary keys are only returned when the summary changes."""
+        agent = make_agent(window_size=4)
+        agent.llm_with_tools = AsyncMock()
+        agent.llm_with_tools.ainvoke.return_value = AIMessage(content="report")
+
+        update = await agent._agent_node(make_state(history(1)))
+
+        assert "context_summary" not in update
+        assert "summarized_count" not in update
+
+
+class TestFastChatCompletion:
+    """Test the direct chat completions call."""
+
+    @pytest.mark.asyncio
+    async def test_uses_resolved_key_and_parses_tool_calls(self):
+        """Test that the key resolved at construction is sent and tool arguments are parsed."""
+        requests = []
+
+        def handler(request):
+            requests.append(request)
+            message = {
+                "content": None,
+                "tool_calls": [
+                    {"id": "call-1", "function": {"name": "scan", "arguments": '{"n": 1}'}},
+                    {"id": "call-2", "function": {"name": "list", "arguments": ""}},
+                ],
+            }
+            return httpx.Response(200, content=orjson.dumps({"choices": [{"message": message}]}))
+
+        agent = make_agent()
+        agent._api_key = "test-key"
+        agent.openai_tools = []
+        agent.llm.openai_api_base = "https://llm.test/v1"
+        client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+        with patch("agent.get_shared_http_client", return_value=client):
+            response = await agent._fast_chat_completion([HumanMessage(content="Audit this contract")])
+        await client.aclose()
+
+        assert str(requests[0].url) == "https://llm.test/v1/chat/completions"
+        assert requests[0].headers["Authorization"] == "Bearer test-key"
+        assert response.content == ""
+        assert [(call["name"], call["args"], call["id"]) for call in response.tool_calls] == [
+            ("scan", {"n": 1}, "call-1"),
+            ("list", {}, "call-2"),
+        ]
+
+
+class TestSimpleAgentNode:
+    """Test the agent node used without tools."""
+
+    @staticmethod
+    def streaming_llm(chunks):
+        """LLM stub whose astream yields the given chunks, raising any exception among them."""
+
+        async def astream(messages):
+            for chunk in chunks:
+                if isinstance(chunk, Exception):
+                    raise chunk
+                yield chunk
+
+        agent = make_agent()
+        agent.llm.astream = astream
+        return agent
+
+    @pytest.mark.asyncio
+    async def test_streams_text_content(self):
+        """Test that string chunks are published and joined into the report."""
+        agent = self.streaming_llm([AIMessageChunk(content="Safe "), AIMessageChunk(content="contract")])
+        state = make_state(history(0))
+
+        with patch("agent.publish_report_chunk") as publish:
+            update = await agent._simple_agent_node(state)
+
+        assert [call.args for call in publish.call_args_list] == [("job-1", "Safe "), ("job-1", "contract")]
+        assert update["final_report"] == "Safe contract"
+        assert [message.content for message in update["messages"]] == ["Safe contract"]
+        assert len(state["messages"]) == 1
+
+    @pytest.mark.asyncio
+    async def test_streams_block_content(self):
+        """Test that text blocks of list content are published and end up as a text report."""
+        agent = self.streaming_llm([
+            AIMessageChunk(content=[{"type": "text", "text": "Safe ", "index": 0}]),
+            AIMessageChunk(content=[{"type": "text", "text": "contract", "index": 0}]),
+        ])
+
+        with patch("agent.publish_report_chunk") as publish:
+            update = await agent._simple_agent_node(make_state(history(0)))
+
+        assert [call.args for call in publish.call_args_list] == [("job-1", "Safe "), ("job-1", "contract")]
+        assert update["final_report"] == "Safe contract"
+        assert isinstance(update["final_report"], str)
+
+    @pytest.mark.asyncio
+    async def test_returns_error(self):
+        """Test that an LLM failure is returned as the error key."""
+        agent = self.streaming_llm([AIMessageChunk(content="Safe "), RuntimeError("boom")])
+
+        with patch("agent.publish_report_chunk"):
+            update = await agent._simple_agent_node(make_state(history(0)))
+
+        assert update == {"error": "boom"}
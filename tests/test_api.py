@@ -1,6 +1,8 @@
 """Test API endpoints."""
 
-import json
+import asyncio
+from unittest.mock import patch
+
 from fastapi.testclient import TestClient
 from models import Job
 from utils import get_current_timestamp
@@ -37,6 +39,19 @@ class TestHealthEndpoint:
         assert "version" in data
 
 
+class TestCacheStatsEndpoint:
+    """Test cache statistics endpoint."""
+
+    def test_cache_stats(self, test_client: TestClient):
+        """Test cache stats expose agent and tool cache counters."""
+        response = test_client.get("/cache-stats")
+
+        assert response.status_code == 200
+        data = response.json()
+        assert {"hits", "misses", "init_ms", "size"} <= data["agents"].keys()
+        assert {"hits", "misses", "size", "maxsize"} <= data["tools"].keys()
+
+
 class TestJobCreation:
     """Test job creation endpoint."""
 
@@ -69,6 +84,22 @@ class TestJobCreation:
         # Should return same job ID
         assert job_id1 == job_id2
 
+    def test_create_jobs_batch(self, test_client: TestClient, sample_job_payload):
+        """Test creating several jobs in one request."""
+        second_payload = {**sample_job_payload, "idempotency_key": "test-456"}
+
+        response = test_client.post(
+            "/jobs/batch", json=[sample_job_payload, second_payload, sample_job_payload]
+        )
+
+        assert response.status_code == 201
+        data = response.json()
+
+        assert len(data) == 3
+        assert data[0]["job_id"] != data[1]["job_id"]
+        assert data[0]["job_id"] == data[2]["job_id"]
+        assert all(job["status"] == "queued" for job in data)
+
     def test_create_job_invalid_payload(self, test_client: TestClient):
         """Test job creation with invalid payload."""
         invalid_payload = {"source": {"type": "invalid"}}
@@ -100,6 +131,20 @@ class TestJobStatus:
         data = response.json()
         assert "not found" in data["detail"].lower()
 
+    def test_get_jobs_status_many(self, test_client: TestClient, sample_job):
+        """Test getting the status of several jobs at once."""
+        response = test_client.post(
+            "/jobs/status_many",
+            json={"job_ids": [sample_job.job_id, "non-existent-job"]},
+        )
+
+        assert response.status_code == 200
+        data = response.json()
+
+        assert list(data["jobs"]) == [sample_job.job_id]
+        assert data["jobs"][sample_job.job_id]["status"] == sample_job.status
+        assert data["missing"] == ["non-existent-job"]
+
 
 class TestJobReport:
     """Test job report endpoint."""
@@ -138,7 +183,7 @@ class TestJobReport:
             finished_at=get_current_timestamp(),
             progress_phase="final",
             progress_percent=100,
-            payload_json=json.dumps(job_payload),
+            payload_json=job_payload,
             report_path="/tmp/test-report.txt",
         )
 
@@ -162,6 +207,77 @@ class TestJobReport:
         assert report_content in response.text
 
 
+class TestJobReportStream:
+    """Test job report streaming endpoint."""
+
+    def test_stream_report_finished_job(self, test_client: TestClient, test_db_session):
+        """Test streaming the stored report of a completed job."""
+        from utils import write_report_file
+
+        report_path = write_report_file("streamed-job-123", "line one\nline two", "/tmp")
+        job = Job(
+            job_id="streamed-job-123",
+            status="succeeded",
+            queued_at=get_current_timestamp(),
+            finished_at=get_current_timestamp(),
+            progress_phase="final",
+            progress_percent=100,
+            payload_json={"source": {"type": "inline"}},
+            report_path=report_path,
+        )
+        test_db_session.add(job)
+        test_db_session.commit()
+
+        response = test_client.get("/jobs/streamed-job-123/report/stream")
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/event-stream")
+        assert "data: line one\ndata: line two\n\n" in response.text
+        assert response.text.endswith("event: end\ndata: \n\n")
+
+    def test_stream_report_not_found(self, test_client: TestClient):
+        """Test streaming the report of a non-existent job."""
+        response = test_client.get("/jobs/non-existent-job/report/stream")
+
+        assert response.status_code == 404
+
+    def test_stream_report_live_tokens(self, test_client: TestClient, sample_job):
+        """Test streaming tokens published while the job runs."""
+        queue = asyncio.Queue()
+        for item in ("Hello", " world", None):
+            queue.put_nowait(item)
+
+        with patch("app.open_report_stream", return_value=queue):
+            response = test_client.get(f"/jobs/{sample_job.job_id}/report/stream")
+
+        assert response.status_code == 200
+        assert response.text == (
+            "data: Hello\n\n" "data:  world\n\n" "event: end\ndata: \n\n"
+        )
+
+    def test_stream_report_live_without_tokens(
+        self, test_client: TestClient, test_db_session, sample_job
+    ):
+        """Test a job finishing without tokens sends its stored report."""
+        from utils import write_report_file
+
+        report_path = write_report_file(sample_job.job_id, "stored report", "/tmp")
+
+        class FinishingQueue(asyncio.Queue):
+            async def get(self):
+                # The worker stores the report, then closes the stream
+                sample_job.status = "succeeded"
+                sample_job.report_path = report_path
+                test_db_session.commit()
+                return None
+
+        with patch("app.open_report_stream", return_value=FinishingQueue()):
+            response = test_client.get(f"/jobs/{sample_job.job_id}/report/stream")
+
+        assert response.status_code == 200
+        assert response.text == "data: stored report\n\nevent: end\ndata: \n\n"
+
+
 class TestJobCancellation:
     """Test job cancellation endpoint."""
 
@@ -176,6 +292,19 @@ class TestJobCancellation:
         assert data["status"] == "canceled"
         assert "canceled_at" in data
 
+    def test_cancel_job_ends_report_streams(self, test_client: TestClient, sample_job):
+        """Test cancelling a queued job ends its report streams."""
+        from agent import open_report_stream, release_report_stream
+
+        queue = open_report_stream(sample_job.job_id)
+        try:
+            response = test_client.post(f"/jobs/{sample_job.job_id}/cancel")
+
+            assert response.status_code == 200
+            assert queue.get_nowait() is None
+        finally:
+            release_report_stream(sample_job.job_id, queue)
+
     def test_cancel_job_not_found(self, test_client: TestClient):
         """Test cancelling non-existent job."""
         response = test_client.post("/jobs/non-existent-job/cancel")
@@ -197,7 +326,7 @@ class TestJobCancellation:
             finished_at=get_current_timestamp(),
             progress_phase="final",
             progress_percent=100,
-            payload_json=json.dumps({"source": {"type": "inline"}}),
+            payload_json={"source": {"type": "inline"}},
         )
 
         test_db_session.add(job)
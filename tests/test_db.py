@@ -1,6 +1,5 @@
 """Test database operations."""
 
-import json
 from sqlalchemy.orm import Session
 
 from db import JobRepository
@@ -21,7 +20,7 @@ class TestJobRepository:
             "queued_at": get_current_timestamp(),
             "progress_phase": "preflight",
             "progress_percent": 0,
-            "payload_json": json.dumps({"source": {"type": "inline"}}),
+            "payload_json": {"source": {"type": "inline"}},
             "idempotency_key": "test-key-123",
         }
 
@@ -31,6 +30,27 @@ class TestJobRepository:
         assert job.status == "queued"
         assert job.idempotency_key == "test-key-123"
 
+    def test_create_jobs(self, test_db_session: Session):
+        """Test creating several jobs at once."""
+        repo = JobRepository(test_db_session)
+
+        rows = [
+            {
+                "job_id": f"batch-job-{i}",
+                "status": "queued",
+                "queued_at": get_current_timestamp(),
+                "progress_phase": "preflight",
+                "progress_percent": 0,
+                "payload_json": {"source": {"type": "inline"}},
+            }
+            for i in range(3)
+        ]
+
+        job_ids = repo.create_jobs(rows)
+
+        assert job_ids == ["batch-job-0", "batch-job-1", "batch-job-2"]
+        assert len(repo.get_queued_jobs()) == 3
+
     def test_get_job(self, test_db_session: Session, sample_job: Job):
         """Test getting job by ID."""
         repo = JobRepository(test_db_session)
@@ -105,7 +125,7 @@ class TestJobRepository:
         assert updated_job.metrics_json is not None
 
         # Parse and verify metrics
-        parsed_metrics = json.loads(updated_job.metrics_json)
+        parsed_metrics = updated_job.metrics_json
         assert parsed_metrics["calls"] == 1
         assert parsed_metrics["prompt_tokens"] == 1000
         assert parsed_metrics["completion_tokens"] == 500
@@ -133,7 +153,7 @@ class TestJobRepository:
                 "queued_at": get_current_timestamp(),
                 "progress_phase": "preflight",
                 "progress_percent": 0,
-                "payload_json": json.dumps({"source": {"type": "inline"}}),
+                "payload_json": {"source": {"type": "inline"}},
             }
             repo.create_job(job_data)
 
@@ -143,6 +163,52 @@ class TestJobRepository:
         for job in queued_jobs:
             assert job.status == "queued"
 
+    def test_get_queued_job_ids(self, test_db_session: Session):
+        """Test getting queued job IDs in queue order."""
+        repo = JobRepository(test_db_session)
+
+        rows = [
+            {
+                "job_id": f"queued-id-{i}",
+                "status": "queued",
+                "queued_at": f"2025-01-01T00:00:0{i}+00:00",
+                "progress_phase": "preflight",
+                "progress_percent": 0,
+                "payload_json": {"source": {"type": "inline"}},
+            }
+            for i in (2, 0, 1)
+        ]
+        repo.create_jobs(rows)
+
+        assert repo.get_queued_job_ids(limit=2) == ["queued-id-0", "queued-id-1"]
+        assert repo.count_running_jobs() == 0
+
+    def test_claim_queued_jobs(self, test_db_session: Session):
+        """Test claiming the oldest queued jobs."""
+        repo = JobRepository(test_db_session)
+
+        rows = [
+            {
+                "job_id": f"claim-job-{i}",
+                "status": "queued",
+                "queued_at": f"2025-01-01T00:00:0{i}+00:00",
+                "progress_phase": "preflight",
+                "progress_percent": 0,
+                "payload_json": {"source": {"type": "inline"}},
+            }
+            for i in range(3)
+        ]
+        repo.create_jobs(rows)
+
+        claimed = repo.claim_queued_jobs(2, "worker-1")
+
+        assert sorted(job.job_id for job in claimed) == ["claim-job-0", "claim-job-1"]
+        for job in claimed:
+            assert job.status == "running"
+            assert job.started_at is not None
+            assert job.worker_id == f"worker-1-{job.job_id}"
+        assert repo.get_queued_job_ids() == ["claim-job-2"]
+
     def test_get_running_jobs(self, test_db_session: Session):
         """Test getting running jobs."""
         repo = JobRepository(test_db_session)
@@ -155,7 +221,7 @@ class TestJobRepository:
             "started_at": get_current_timestamp(),
             "progress_phase": "analysis",
             "progress_percent": 50,
-            "payload_json": json.dumps({"source": {"type": "inline"}}),
+            "payload_json": {"source": {"type": "inline"}},
             "worker_id": "worker-123",
         }
         repo.create_job(job_data)
@@ -163,6 +229,7 @@ class TestJobRepository:
         running_jobs = repo.get_running_jobs()
 
         assert len(running_jobs) == 1
+        assert repo.count_running_jobs() == 1
         assert running_jobs[0].status == "running"
         assert running_jobs[0].worker_id == "worker-123"
 
@@ -217,7 +284,7 @@ class TestJobRepository:
             "finished_at": get_current_timestamp(),
             "progress_phase": "final",
             "progress_percent": 100,
-            "payload_json": json.dumps({"source": {"type": "inline"}}),
+            "payload_json": {"source": {"type": "inline"}},
         }
         repo.create_job(job_data)
 
@@ -242,7 +309,7 @@ class TestJobRepository:
             "started_at": stale_time_str,
             "progress_phase": "analysis",
             "progress_percent": 50,
-            "payload_json": json.dumps({"source": {"type": "inline"}}),
+            "payload_json": {"source": {"type": "inline"}},
             "worker_id": "worker-123",
         }
         repo.create_job(job_data)
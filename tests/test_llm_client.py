@@ -1,10 +1,42 @@
 """Test LLM client functionality."""
 
+import asyncio
+from contextlib import asynccontextmanager
+
+import httpx
+import orjson
 import pytest
 from unittest.mock import AsyncMock, patch, MagicMock
 from llm_client import LLMClient
 
 
+def sse_response(status_code, content="", usage=None, text=""):
+    """Build an OpenRouter streaming response split over two content deltas."""
+    if status_code != 200:
+        return httpx.Response(status_code, text=text)
+
+    events = [
+        {"choices": [{"delta": {"content": part}}]}
+        for part in (content[:5], content[5:])
+    ]
+    events.append({"choices": [], "usage": usage})
+    body = ": OPENROUTER PROCESSING\n\n"
+    body += "".join(f"data: {orjson.dumps(event).decode()}\n\n" for event in events)
+    body += "data: [DONE]\n\n"
+    return httpx.Response(200, content=body.encode())
+
+
+def mock_stream(response, delay=0.0):
+    """Stand-in for httpx.AsyncClient.stream yielding a canned response."""
+
+    @asynccontextmanager
+    async def stream(*args, **kwargs):
+        await asyncio.sleep(delay)
+        yield response
+
+    return stream
+
+
 class TestLLMClient:
     """Test LLM client."""
 
@@ -187,16 +219,15 @@ class TestLLMClient:
         llm_client_real._ensure_agent_initialized = mock_ensure_agent_initialized
 
         # Mock direct LLM fallback
-        mock_response_data = {
-            "choices": [{"message": {"content": "Success after fallback"}}],
-            "usage": {"prompt_tokens": 50, "completion_tokens": 100},
-        }
+        mock_response = sse_response(
+            200,
+            "Success after fallback",
+            usage={"prompt_tokens": 50, "completion_tokens": 100},
+        )
 
-        with patch.object(llm_client_real.client, "post") as mock_post:
-            mock_response = AsyncMock()
-            mock_response.status_code = 200
-            mock_response.json = lambda: mock_response_data
-            mock_post.return_value = mock_response
+        with patch.object(
+            llm_client_real.client, "stream", side_effect=mock_stream(mock_response)
+        ):
 
             # Should fallback to direct LLM
             report, metrics = await llm_client_real.analyze_code(
@@ -231,11 +262,10 @@ class TestLLMClient:
         llm_client_real._ensure_agent_initialized = mock_ensure_agent_initialized
 
         # Mock direct LLM fallback to also fail
-        with patch.object(llm_client_real.client, "post") as mock_post:
-            error_response = AsyncMock()
-            error_response.status_code = 400
-            error_response.text = "Bad Request"
-            mock_post.return_value = error_response
+        error_response = sse_response(400, text="Bad Request")
+        with patch.object(
+            llm_client_real.client, "stream", side_effect=mock_stream(error_response)
+        ):
 
             # Should raise exception after both agent and fallback fail
             with pytest.raises(Exception, match="OpenRouter API error"):
@@ -253,16 +283,15 @@ class TestLLMClient:
         }
 
         # Mock direct LLM response
-        mock_response_data = {
-            "choices": [{"message": {"content": "Direct LLM response"}}],
-            "usage": {"prompt_tokens": 75, "completion_tokens": 150},
-        }
+        mock_response = sse_response(
+            200,
+            "Direct LLM response",
+            usage={"prompt_tokens": 75, "completion_tokens": 150},
+        )
 
-        with patch.object(llm_client_no_mcp.client, "post") as mock_post:
-            mock_response = AsyncMock()
-            mock_response.status_code = 200
-            mock_response.json = lambda: mock_response_data
-            mock_post.return_value = mock_response
+        with patch.object(
+            llm_client_no_mcp.client, "stream", side_effect=mock_stream(mock_response)
+        ):
 
             # Should use direct LLM call
             report, metrics = await llm_client_no_mcp.analyze_code(
@@ -275,6 +304,75 @@ class TestLLMClient:
             assert metrics["completion_tokens"] == 150
             assert metrics["model"] == "anthropic/claude-3.5-sonnet"
 
+    @pytest.mark.asyncio
+    async def test_identical_calls_share_one_request(self, llm_client_no_mcp):
+        """Test concurrent and repeated identical calls make one API request."""
+        code = "contract Test { function test() public {} }"
+        audit_profile = "erc20_basic_v1"
+
+        mock_response = sse_response(
+            200,
+            "Shared response",
+            usage={"prompt_tokens": 75, "completion_tokens": 150},
+        )
+
+        with patch.object(
+            llm_client_no_mcp.client,
+            "stream",
+            side_effect=mock_stream(mock_response, delay=0.05),
+        ) as mock_stream_call:
+            results = await asyncio.gather(
+                *(
+                    llm_client_no_mcp._call_openrouter_api(
+                        code, audit_profile, f"job-{i}"
+                    )
+                    for i in range(3)
+                )
+            )
+            repeat = await llm_client_no_mcp._call_openrouter_api(
+                code, audit_profile, "job-repeat"
+            )
+
+        assert mock_stream_call.call_count == 1
+        assert all(report == "Shared response" for report, _ in results)
+        assert sum(metrics["calls"] for _, metrics in results) == 1
+        assert repeat[0] == "Shared response"
+        assert repeat[1]["calls"] == 0
+
+    @pytest.mark.asyncio
+    async def test_cancelled_leader_does_not_cancel_joiners(self, llm_client_no_mcp):
+        """Test a joiner makes its own request when the shared call is cancelled."""
+        code = "contract Test { function test() public {} }"
+        audit_profile = "erc20_basic_v1"
+
+        mock_response = sse_response(
+            200,
+            "Retried response",
+            usage={"prompt_tokens": 75, "completion_tokens": 150},
+        )
+
+        with patch.object(
+            llm_client_no_mcp.client,
+            "stream",
+            side_effect=mock_stream(mock_response, delay=0.05),
+        ) as mock_stream_call:
+            leader = asyncio.create_task(
+                llm_client_no_mcp._call_openrouter_api(code, audit_profile, "job-1")
+            )
+            await asyncio.sleep(0)
+            joiner = asyncio.create_task(
+                llm_client_no_mcp._call_openrouter_api(code, audit_profile, "job-2")
+            )
+            await asyncio.sleep(0.01)
+            leader.cancel()
+
+            report, metrics = await joiner
+
+        assert leader.cancelled()
+        assert report == "Retried response"
+        assert metrics["calls"] == 1
+        assert mock_stream_call.call_count == 2
+
     def test_build_prompt(self, llm_client_dry_run):
         """Test prompt building."""
         code = "contract Test { function test() public {} }"
@@ -287,6 +385,28 @@ class TestLLMClient:
         assert code in prompt
         assert "ERC20" in prompt or "security" in prompt.lower()
 
+    def test_build_body(self, llm_client_dry_run):
+        """Test the spliced request body carries the full prompt."""
+        code = 'contract Test { string s = "quote\\\\ \\u00e9"; }\n'
+
+        for audit_profile in ("erc20_basic_v1", "general_v1", "unknown"):
+            body = orjson.loads(llm_client_dry_run._build_body(code, audit_profile))
+
+            assert body["stream"] is True
+            assert body["messages"][-1] == {
+                "role": "user",
+                "content": llm_client_dry_run._build_prompt(code, audit_profile),
+            }
+
+    def test_backoff_delay(self, llm_client_dry_run):
+        """Test retry delays grow gently and stay under the cap."""
+        for attempt in range(3):
+            delay = llm_client_dry_run._backoff_delay(attempt)
+            base = 0.5 * 1.5**attempt
+            assert 0.5 * base <= delay <= 1.5 * base
+
+        assert llm_client_dry_run._backoff_delay(20) <= 8.0 * 1.5
+
     def test_calculate_cost(self, llm_client_dry_run):
         """Test cost calculation."""
         usage = {"prompt_tokens": 1000, "completion_tokens": 500}
@@ -0,0 +1,197 @@
+"""Test MCP manager functionality."""
+
+import asyncio
+
+import httpx
+import orjson
+import pytest
+import pytest_asyncio
+from unittest.mock import patch
+
+from langchain_core.messages import AIMessage
+
+from agent import AuditAgent, MCPToolWrapper
+from mcp_config import MCPConfig, MCPServerConfig
+from mcp_manager import MCPManager, MockHTTPSession
+
+
+def mcp_transport(requests, batch_rejection=None, strict_initialize=False):
+    """Mock transport for JSON-RPC MCP servers; each exposes one tool named after its host.
+
+    batch_rejection makes servers refuse batch arrays, either with an HTTP
+    400 ("status") or with a single JSON-RPC error object ("error").
+    strict_initialize makes servers reject other requests until initialize
+    has been answered, as the reference MCP SDK does.
+    """
+    initialized = set()
+
+    def reply(message, host):
+        method = message["method"]
+        if method == "tools/list":
+            schema = {"type": "object", "properties": {"n": {"type": "integer"}}, "required": ["n"]}
+            result = {"tools": [{"name": f"{host}_tool", "inputSchema": schema}]}
+        elif method == "resources/list":
+            result = {"resources": []}
+        elif method == "tools/call":
+            params = message["params"]
+            result = {"content": [{"type": "text", "text": f"{params['name']}:{params['arguments']['n']}"}]}
+        else:
+            result = {}
+        return {"jsonrpc": "2.0", "id": message["id"], "result": result}
+
+    async def handler(request):
+        body = orjson.loads(await request.aread())
+        requests.append((request.url.host, body))
+        host = request.url.host
+        if isinstance(body, dict) and body["method"] == "initialize":
+            # Answer after the listings sent alongside have been handled
+            await asyncio.sleep(0.01)
+            initialized.add(host)
+        elif strict_initialize and host not in initialized:
+            error = {"jsonrpc": "2.0", "id": body["id"], "error": {"code": -32002, "message": "Not initialized"}}
+            return httpx.Response(200, json=error)
+        if isinstance(body, list) and batch_rejection:
+            error = {"jsonrpc": "2.0", "id": None, "error": {"code": -32600, "message": "Invalid Request"}}
+            return httpx.Response(400 if batch_rejection == "status" else 200, json=error)
+        if isinstance(body, list):
+            # Answer batches out of order; replies are matched by id
+            return httpx.Response(200, json=[reply(message, request.url.host) for message in reversed(body)])
+        return httpx.Response(200, json=reply(body, request.url.host))
+
+    return httpx.MockTransport(handler)
+
+
+@pytest.fixture
+def mcp_requests():
+    """(host, JSON body) of each request the mock MCP servers receive."""
+    return []
+
+
+@pytest_asyncio.fixture
+async def mcp_manager(mcp_requests):
+    """MCP manager connected to two mock HTTP servers."""
+    config = MCPConfig(
+        servers=[
+            MCPServerConfig(name="alpha", transport="http", url="http://alpha/mcp"),
+            MCPServerConfig(name="beta", transport="http", url="http://beta/mcp"),
+        ]
+    )
+    transport = mcp_transport(mcp_requests)
+    with patch("mcp_manager._new_http_client", return_value=httpx.AsyncClient(transport=transport)):
+        manager = MCPManager(config)
+        assert await manager.initialize()
+
+    mcp_requests.clear()
+    yield manager
+    await manager.shutdown()
+
+
+class TestMCPManager:
+    """Test MCP manager."""
+
+    @pytest.mark.asyncio
+    async def test_call_tools_sends_one_batch_per_server(self, mcp_manager, mcp_requests):
+        """Test tool calls are grouped into one JSON-RPC batch per server."""
+        results = await mcp_manager.call_tools([
+            ("alpha_tool", {"n": 1}, None),
+            ("beta_tool", {"n": 2}, "beta"),
+            ("alpha_tool", {"n": 3}, "alpha"),
+        ])
+
+        assert [result["content"][0].text for result in results] == [
+            "alpha_tool:1", "beta_tool:2", "alpha_tool:3"
+        ]
+        assert not any(result["is_error"] for result in results)
+
+        batches = dict(mcp_requests)
+        assert len(mcp_requests) == 2
+        assert [message["params"]["arguments"]["n"] for message in batches["alpha"]] == [1, 3]
+        assert [message["params"]["arguments"]["n"] for message in batches["beta"]] == [2]
+
+    @pytest.mark.asyncio
+    async def test_call_tools_unknown_tool(self, mcp_manager, mcp_requests):
+        """Test calling a tool no server exposes."""
+        with pytest.raises(ValueError):
+            await mcp_manager.call_tools([("missing_tool", {}, None)])
+
+        assert mcp_requests == []
+
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("batch_rejection", ["status", "error"])
+    async def test_rejected_batch_falls_back_to_single_calls(self, batch_rejection):
+        """Test a server refusing batches gets the calls singly, and no batch afterwards."""
+        requests = []
+        client = httpx.AsyncClient(transport=mcp_transport(requests, batch_rejection))
+        session = MockHTTPSession("http://alpha/mcp", client)
+
+        results = await session.call_tools_batch([("alpha_tool", {"n": 1}), ("alpha_tool", {"n": 2})])
+
+        assert [result.content[0].text for result in results] == ["alpha_tool:1", "alpha_tool:2"]
+        assert not any(result.isError for result in results)
+        assert [isinstance(body, list) for _, body in requests] == [True, False, False]
+        assert not session.batch_supported
+
+        requests.clear()
+        results = await session.call_tools_batch([("alpha_tool", {"n": 3})])
+
+        assert results[0].content[0].text == "alpha_tool:3"
+        assert [isinstance(body, list) for _, body in requests] == [False]
+        await session.close()
+
+
+    @pytest.mark.asyncio
+    async def test_listing_rejected_before_initialize_is_requeried(self):
+        """Test listings refused during the initialize handshake are fetched again afterwards."""
+        requests = []
+        client = httpx.AsyncClient(transport=mcp_transport(requests, strict_initialize=True))
+        config = MCPConfig(servers=[MCPServerConfig(name="alpha", transport="http", url="http://alpha/mcp")])
+        with patch("mcp_manager._new_http_client", return_value=client):
+            manager = MCPManager(config)
+            assert await manager.initialize()
+
+        assert [tool["name"] for tool in manager.get_available_tools()] == ["alpha_tool"]
+        assert [body["method"] for _, body in requests].count("tools/list") == 2
+        await manager.shutdown()
+
+
+class TestAgentToolBatches:
+    """Test the parallel agent graph batches tool calls per server."""
+
+    @pytest.mark.asyncio
+    async def test_turn_sends_one_batch_per_server(self, mcp_manager, mcp_requests):
+        """Test a turn's tool calls reach each server as one request and repeats hit the cache."""
+        agent = AuditAgent.__new__(AuditAgent)
+        agent.mcp_manager = mcp_manager
+        agent.tool_semaphore = asyncio.Semaphore(4)
+        agent.tools_by_name = {}
+        for tool_info in mcp_manager.get_available_tools():
+            tool = MCPToolWrapper(tool_info, mcp_manager)
+            agent.tools_by_name[tool.name] = tool
+
+        tool_calls = [
+            {"name": "alpha_alpha_tool", "args": {"n": 1}, "id": "call-1"},
+            {"name": "beta_beta_tool", "args": {"n": "2"}, "id": "call-2"},
+            {"name": "alpha_alpha_tool", "args": {"n": 3}, "id": "call-3"},
+            {"name": "missing_tool", "args": {}, "id": "call-4"},
+        ]
+        state = {"messages": [AIMessage(content="", tool_calls=tool_calls)], "iteration": 0, "max_iterations": 5}
+
+        async def run_turn():
+            sends = agent._dispatch_tool_calls(state)
+            updates = await asyncio.gather(*(agent._tool_worker_node(send.arg) for send in sends))
+            return {message.tool_call_id: message for update in updates for message in update["messages"]}
+
+        messages = await run_turn()
+
+        assert len(mcp_requests) == 2
+        assert all(isinstance(body, list) for _, body in mcp_requests)
+        assert messages["call-1"].content == "alpha_tool:1"
+        assert messages["call-2"].content == "beta_tool:2"
+        assert messages["call-3"].content == "alpha_tool:3"
+        assert messages["call-4"].status == "error"
+
+        repeated = await run_turn()
+
+        assert len(mcp_requests) == 2
+        assert repeated["call-3"].content == "alpha_tool:3"
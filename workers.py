@@ -1,14 +1,14 @@
 """Job workers for processing audit tasks."""
 
 import asyncio
-import json
 from typing import Dict, Any
 
 from loguru import logger
 from sqlalchemy.orm import Session
 
+from agent import close_report_stream
 from db import SessionLocal, JobRepository
-from llm_client import llm_client
+from llm_client import get_llm_client
 from models import Job
 from settings import settings
 from utils import write_report_file
@@ -30,7 +30,7 @@ class JobWorker:
             repo = JobRepository(db)
 
             # Parse job payload
-            payload = json.loads(job.payload_json)
+            payload = job.payload_json
 
             # Process job phases
             await self._process_preflight(job, repo, payload)
@@ -59,6 +59,7 @@ class JobWorker:
             logger.error(f"Worker {self.worker_id} error for job {job.job_id}: {e}")
             self._mark_job_failed(db, job.job_id, str(e))
         finally:
+            close_report_stream(job.job_id)
             db.close()
 
     async def _process_preflight(
@@ -150,12 +151,17 @@ class JobWorker:
 
         # Call LLM for analysis
         audit_profile = payload.get("audit_profile", "general_v1")
-        report_content, metrics = await llm_client.analyze_code(
+        report_content, metrics = await get_llm_client().analyze_code(
             source_code, audit_profile, job.job_id, payload
         )
 
         logger.info(
-            f"Job {job.job_id}: LLM returned content length: {len(report_content)}, first 100 chars: {report_content[:100]}"
+            f"Job {job.job_id}: LLM returned content length: {len(report_content)}"
+        )
+        logger.opt(lazy=True).debug(
+            "Job {}: LLM content starts with: {}",
+            lambda: job.job_id,
+            lambda: report_content[:100],
         )
 
         # Check for cancellation
@@ -187,10 +193,8 @@ class JobWorker:
             logger.error(f"Job {job.job_id} missing metrics from LLM phase")
             return
 
-        # Parse metrics from the LLM phase
-        import json
-
-        metrics = json.loads(current_job.metrics_json)
+        # Metrics from the LLM phase
+        metrics = current_job.metrics_json
 
         # Get the report content from the LLM phase (stored in error_message temporarily)
         report_content = current_job.error_message
@@ -208,9 +212,8 @@ class JobWorker:
         # Write report to file
         report_path = write_report_file(job.job_id, report_content, settings.data_dir)
 
-        # Update job with report path and metrics
+        # Update job with report path; metrics were stored by the LLM phase
         repo.update_job_status(job.job_id, "running", report_path=report_path)
-        repo.update_job_metrics(job.job_id, metrics)
 
         logger.info(f"Job {job.job_id}: Reporting phase completed")
 
@@ -278,8 +281,8 @@ class JobWorker:
             logger.info(f"Job {job_id}: Cancelled by local flag")
             return True
 
-        # Check database for cancellation
-        job = repo.get_job(job_id)
+        # Check database for cancellation made by the API's session
+        job = repo.get_job(job_id, refresh=True)
         if job and job.status == "canceled":
             logger.info(f"Job {job_id}: Cancelled in database")
             self.cancel_flag = True